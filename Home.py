@@ -4,11 +4,24 @@ import altair as alt
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+from utils import analytics, charts, filters, profiling, sketch, snapshot, store
+from utils.partials import file_partials
+from utils.dedupe import TransactionIndex
+from utils.donor_ids import DonorDictionary
+from utils.ingest import load_uploads
+from utils.schema import concat_frames, memory_saved, prune_categories
+from utils.session import (
+    approximate_counts, approximate_toggle, get_dataset_version, get_donor_data, get_donor_sketch, get_donor_summary,
+    update_dataset_version,
+)
+from utils.tables import detail_expander
+
 st.set_page_config(
     page_title="CVC Donor Insights Dashboard",
     layout="wide",
     page_icon="📊"
 )
+profiling.begin("Home")
 
 st.markdown("""
     <style>
@@ -69,26 +82,22 @@ with col4:
     st.page_link("pages/Cohort_Analysis.py", label="📊 Cohort Analysis")
 
 # --- Uploading Logic ---
-# Initialize session state
+# Initialize session state, reopening the last saved snapshot in a new session
+snapshot.restore()
 if 'donor_data' not in st.session_state:
     st.session_state['donor_data'] = pd.DataFrame()
 if 'uploaded_file_names' not in st.session_state:
     st.session_state['uploaded_file_names'] = []
 if 'last_uploaded_files' not in st.session_state:
     st.session_state['last_uploaded_files'] = []
-
-# Helper function to deduplicate column names
-def deduplicate_columns(columns):
-    seen = {}
-    new_cols = []
-    for col in columns:
-        if col not in seen:
-            seen[col] = 1
-            new_cols.append(col)
-        else:
-            seen[col] += 1
-            new_cols.append(f"{col}_{seen[col]}")
-    return new_cols
+if 'donor_dictionary' not in st.session_state:
+    st.session_state['donor_dictionary'] = DonorDictionary()
+if 'file_hashes' not in st.session_state:
+    st.session_state['file_hashes'] = {}
+if 'file_partials' not in st.session_state:
+    st.session_state['file_partials'] = {}
+if 'transaction_index' not in st.session_state:
+    st.session_state['transaction_index'] = TransactionIndex()
 
 # File uploader
 uploaded_files = st.sidebar.file_uploader(
@@ -105,47 +114,65 @@ if uploaded_files:
     # Check for removed files (user clicked grey X)
     removed_files = list(set(st.session_state['last_uploaded_files']) - set(current_file_names))
     if removed_files:
-        st.session_state['donor_data'] = st.session_state['donor_data'][
-            ~st.session_state['donor_data']['Source File'].isin(removed_files)
-        ]
+        # Files that skipped duplicates may now own those rows; they are loaded again below
+        for name in removed_files:
+            st.session_state['transaction_index'].remove(name)
+        reloaded = [name for name in st.session_state['transaction_index'].dependents() if name in current_file_names]
+        for name in reloaded:
+            st.session_state['transaction_index'].remove(name)
+        removed_files += reloaded
+        if not store.ENABLED:
+            st.session_state['donor_data'] = prune_categories(st.session_state['donor_data'][
+                ~st.session_state['donor_data']['Source File'].isin(removed_files)
+            ].reset_index(drop=True))
         st.session_state['uploaded_file_names'] = [
             f for f in st.session_state['uploaded_file_names'] if f not in removed_files
         ]
+        for name in removed_files:
+            st.session_state['file_hashes'].pop(name, None)
+            st.session_state['file_partials'].pop(name, None)
 
     # Process new files
     new_data = []
     new_file_names = []
 
-    for file in uploaded_files:
-        if file.name in st.session_state['uploaded_file_names']:
-            continue
-        try:
-            sheet = pd.ExcelFile(file).sheet_names[0]
-            df = pd.read_excel(file, sheet_name=sheet, header=1)
-            df.columns = deduplicate_columns(df.columns.str.strip())
-
-            # Normalize expected column names
-            df.rename(columns={'Transaction Date (UTC)': 'Date', 'Amount': 'Donation Amount', 'Postal Code': 'ZIP'}, inplace=True)
-
-            # Safe filtering
-            first_name_series = df.get('First Name', pd.Series([None]*len(df)))
-            org_name_series = df.get('Business/Organization Name', pd.Series([None]*len(df)))
-            df = df[first_name_series.notna() | org_name_series.notna()]
-
-            df['Donation Amount'] = pd.to_numeric(df.get('Donation Amount'), errors='coerce')
-            df['Date'] = pd.to_datetime(df.get('Date'), errors='coerce')
-            org_name_series = df.get('Business/Organization Name', pd.Series([None]*len(df)))
-            df['Donor Type'] = org_name_series.apply(lambda x: 'Organization' if pd.notna(x) else 'Individual')
-            df['Source File'] = file.name
-
-            new_data.append(df)
-            new_file_names.append(file.name)
-        except Exception as e:
-            st.warning(f"⚠️ Could not process `{file.name}`: {e}")
+    with profiling.section("Ingest Uploads", rows=0) as prof:
+        pending_files = [f for f in uploaded_files if f.name not in st.session_state['uploaded_file_names']]
+        for file_name, file_hash, df, error in load_uploads([(f.name, f.getvalue()) for f in pending_files]):
+            if error is not None:
+                st.warning(f"⚠️ Could not process `{file_name}`: {error}")
+                continue
+            df['Donor ID'] = st.session_state['donor_dictionary'].encode(df)
+            keep = st.session_state['transaction_index'].add(file_name, df)
+            if store.ENABLED:
+                # Only the shared store keeps the rows, all of them; the Selection drops duplicates
+                store.add_file(file_hash, df)
+            if not keep.all():
+                df = df[keep].reset_index(drop=True)
+            # Overview KPIs and charts merge these instead of rescanning every row
+            st.session_state['file_partials'][file_name] = file_partials(df)
+            if not store.ENABLED:
+                new_data.append(df)
+            prof.rows += len(df)
+            new_file_names.append(file_name)
+            st.session_state['file_hashes'][file_name] = file_hash
 
     if new_data:
-        st.session_state['donor_data'] = pd.concat([st.session_state['donor_data']] + new_data, ignore_index=True)
-        st.session_state['uploaded_file_names'].extend(new_file_names)
+        st.session_state['donor_data'] = concat_frames([st.session_state['donor_data']] + new_data)
+    st.session_state['uploaded_file_names'].extend(new_file_names)
+
+    if removed_files or new_file_names:
+        update_dataset_version()
+        if store.ENABLED:
+            st.session_state['donor_data'] = store.Selection(
+                st.session_state['file_hashes'].values(), st.session_state['donor_dictionary'],
+                dedupe=bool(st.session_state['transaction_index'].dependents())
+            )
+            store.use(st.session_state['file_hashes'].values())
+        else:
+            st.session_state['memory_saved'] = memory_saved(st.session_state['donor_data'])
+        with profiling.section("Save Snapshot", rows=len(st.session_state['donor_data'])):
+            snapshot.save()
 
     # Update file state
     st.session_state['last_uploaded_files'] = current_file_names
@@ -153,7 +180,15 @@ if uploaded_files:
 # Display sidebar info
 st.sidebar.markdown("### 📂 Files Processed:")
 for name in st.session_state['uploaded_file_names']:
-    st.sidebar.markdown(f"• `{name}`")
+    skipped = st.session_state['transaction_index'].skipped.get(name, 0)
+    st.sidebar.markdown(f"• `{name}`" + (f" — {skipped:,} duplicate rows skipped" if skipped else ""))
+if st.session_state.get('restored_snapshot'):
+    st.sidebar.caption("♻️ Restored from the last saved session")
+    st.sidebar.button("Clear restored data", on_click=snapshot.clear, key="snapshot_clear")
+if st.session_state.get('precomputed_report') and not st.session_state['donor_data'].empty:
+    st.sidebar.caption("⚡ Using a prebuilt report for these files")
+if not store.ENABLED and not st.session_state['donor_data'].empty:
+    st.sidebar.caption(f"🧮 Compact schema saves ~{st.session_state.get('memory_saved', 0) / 1024**2:,.1f} MB in this session")
 
 # Placeholder confirmation
 if not st.session_state['donor_data'].empty:
@@ -161,110 +196,34 @@ if not st.session_state['donor_data'].empty:
 else:
     st.info("📥 Please upload donation file(s) to begin.")
 
-# ------------------------- DATA ANALYSIS AND DISPLAY ---------------------------------
-if 'donor_data' in st.session_state and not st.session_state['donor_data'].empty:
-    df = st.session_state['donor_data']
-    # --- Fundraising Trend ---
-    st.subheader("📅 Fundraising Over Time")
-    time_df = df.copy()
-    time_df = time_df.dropna(subset=['Date'])
-    time_df['Month'] = time_df['Date'].dt.to_period('M').dt.to_timestamp()
-    monthly_donations = time_df.groupby('Month')['Donation Amount'].sum().reset_index()
-    monthly_donations['Cumulative Total'] = monthly_donations['Donation Amount'].cumsum()
-
-    brush = alt.selection_interval(encodings=['x'])
-
-    base = alt.Chart(monthly_donations).encode(
-        x=alt.X('Month:T', title='Month'),
-        y=alt.Y('Cumulative Total:Q', title='Cumulative Donations'),
-        tooltip=['Month', 'Cumulative Total']
-    )
-
-    area = base.mark_area(opacity=0.3, color="#FDBA21").add_selection(brush)
-    line = base.mark_line(color='#F25C54', point=False)
-
-    # Define text for relative gain in highlighted region
-    start_value = alt.Chart(monthly_donations).transform_filter(brush).mark_rule(color='gray').encode(
-        x='min(Month):T'
-    )
-    end_value = alt.Chart(monthly_donations).transform_filter(brush).mark_rule(color='gray').encode(
-        x='max(Month):T'
-    )
-
-    summary_text = alt.Chart(monthly_donations).transform_filter(brush).transform_aggregate(
-        start_value='min(Cumulative Total)',
-        end_value='max(Cumulative Total)',
-        start_month='min(Month)',
-        end_month='max(Month)'
-    ).transform_calculate(
-        percent_increase='(datum.end_value - datum.start_value) / datum.start_value * 100',
-        formatted_text='"From " + timeFormat(datum.start_month, "%b %Y") + " to " + timeFormat(datum.end_month, "%b %Y") + ": +" + format(datum.percent_increase, ".1f") + "%"'
-    ).mark_text(
-        align='left',
-        baseline='top',
-        dx=15,
-        dy=10,
-        fontSize=14,
-        fontWeight='bold',
-        color='#1F3C4C'
-    ).encode(
-        x=alt.value(10),
-        y=alt.value(10),
-        text='formatted_text:N'
-    )
-
-    time_chart = (area + line + start_value + end_value + summary_text).properties(height=400)
-
-    st.altair_chart(time_chart.configure_view(
-        stroke=None,
-        fill='#ffffff'
-    ).configure_axis(
-        labelColor='#1F3C4C',
-        titleColor='#1F3C4C'
-    ).configure_title(color='#1F3C4C'), use_container_width=True)
-
-    # --- Overview Stats ---
-    total_donations = df['Donation Amount'].sum()
-    unique_donors = df['Email'].nunique()
-    repeat_donors = df['Email'].value_counts().loc[lambda x: x > 1].count()
-    org_donors = (df['Donor Type'] == 'Organization').sum()
-
-    st.markdown("""<div class="metric-container">""", unsafe_allow_html=True)
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Raised", f"${total_donations:,.0f}")
-    col2.metric("Unique Donors", unique_donors)
-    col3.metric("Repeat Donors", repeat_donors)
-    col4.metric("Organizations", org_donors)
-
-    # --- Campaign Performance and Donor Demographics ---
-    col1, col2 = st.columns(2)
-
-    with col1:
+# ------------------------- SECTIONS WITH WIDGETS ---------------------------------
+@profiling.fragment
+def campaign_performance(version, df):
+    """Campaign totals chart and detail table."""
+    with profiling.section("Campaign Performance", rows=len(df)) as prof:
         st.subheader("📌 Campaign Performance")
-        campaign_summary = df.groupby('Campaign Title')['Donation Amount'].agg(['sum', 'count', 'mean']).reset_index()
-        campaign_summary = campaign_summary.rename(columns={
-            'sum': 'Total Raised', 'count': 'Donation Count', 'mean': 'Average Gift'
-        })
-        campaign_summary['Total Raised'] = pd.to_numeric(campaign_summary['Total Raised'], errors='coerce')
-        campaign_summary = campaign_summary.dropna(subset=['Total Raised'])
-
-        st.altair_chart(
-            alt.Chart(campaign_summary).mark_bar().encode(
+        campaign_summary = analytics.campaign_summary(version, df)
+
+        st.altair_chart(prof.chart(
+            alt.Chart(charts.top_rows(campaign_summary, 'Total Raised')).mark_bar().encode(
                 x=alt.X('Campaign Title:N', sort='-y'),
                 y=alt.Y('Total Raised:Q'),
                 tooltip=['Campaign Title', 'Total Raised']
-            ).properties(height=300),
-            use_container_width=True
+            ).properties(height=300)),
+            width='stretch'
         )
 
-        campaign_n = st.selectbox("Number of campaigns to show in detail:", ['All', 10, 25, 50, 100], index=1)
-        with st.expander("See campaign detail table", expanded=False):
-            st.dataframe(campaign_summary if campaign_n == 'All' else campaign_summary.head(campaign_n))
+        detail_expander("See campaign detail table", "campaign_detail", campaign_summary,
+                        sort_by='Total Raised', search_columns=['Campaign Title'])
 
-    with col2:
+
+@profiling.fragment
+def donor_demographics(version, df):
+    """Top ZIP codes chart and detail table."""
+    with profiling.section("Donor Demographics", rows=len(df)) as prof:
         st.subheader("🌍 Donor Demographics")
         if 'ZIP' in df.columns:
-            zip_summary = df.groupby('ZIP')['Donation Amount'].sum().sort_values(ascending=False)
+            zip_summary = analytics.zip_summary(version, df)
             zip_data = zip_summary.head(10).reset_index()
             zip_pie = alt.Chart(zip_data).mark_arc(innerRadius=50).encode(
                 theta=alt.Theta(field="Donation Amount", type="quantitative"),
@@ -272,46 +231,47 @@ if 'donor_data' in st.session_state and not st.session_state['donor_data'].empty
                                 scale=alt.Scale(range=["#FDBA21", "#F25C54", "#6096BA", "#57B894", "#F49F0A", "#EF476F", "#118AB2", "#06D6A0", "#FFD166", "#8D99AE"])),
                 tooltip=["ZIP", "Donation Amount"]
             ).properties(height=300)
-            st.altair_chart(zip_pie.configure_view(
+            st.altair_chart(prof.chart(zip_pie.configure_view(
                 stroke=None,
                 fill='#ffffff'
             ).configure_legend(
                 labelColor='#1F3C4C',
                 titleColor='#1F3C4C'
-            ), use_container_width=True)
+            )), width='stretch')
 
-        zip_n = st.selectbox("Number of ZIP codes to show in detail:", ['All', 10, 25, 50, 100], index=1, key="zip")
-        with st.expander("See ZIP code donation detail", expanded=False):
-            st.dataframe(zip_summary.reset_index() if zip_n == 'All' else zip_summary.head(zip_n).reset_index())
+            detail_expander("See ZIP code donation detail", "zip_detail", zip_summary.reset_index,
+                            sort_by='Donation Amount', search_columns=['ZIP'])
 
-    # --- Retention Overview ---
-    with col1:
+
+@profiling.fragment
+def retention_signals(version, donor_summary):
+    """New vs. returning donors chart and detail table."""
+    with profiling.section("Donor Retention Signals", rows=len(donor_summary)) as prof:
         st.subheader("🔁 Donor Retention Signals")
-        donor_dates = df.groupby('Email')['Date'].agg(['min', 'max', 'count'])
-        donor_dates['Retention Status'] = donor_dates['count'].apply(lambda x: 'Returning' if x > 1 else 'New')
-        retention_counts = donor_dates['Retention Status'].value_counts()
-        retention_data = retention_counts.reset_index()
-        retention_data.columns = ["Retention Status", "Count"]
+        donor_dates = donor_summary[['Donor', 'First Gift', 'Last Gift', 'Gift Count', 'Retention Status']]
+        retention_data = analytics.retention_counts(version, donor_summary)
         retention_pie = alt.Chart(retention_data).mark_arc(innerRadius=50).encode(
             theta=alt.Theta(field="Count", type="quantitative"),
             color=alt.Color(field="Retention Status", type="nominal",
                             scale=alt.Scale(range=["#57B894", "#F25C54"])),
             tooltip=["Retention Status", "Count"]
         ).properties(height=300)
-        st.altair_chart(retention_pie.configure_view(
+        st.altair_chart(prof.chart(retention_pie.configure_view(
                 stroke=None,
                 fill='#ffffff'
             ).configure_legend(
                 labelColor='#1F3C4C',
                 titleColor='#1F3C4C'
-            ), use_container_width=True)
+            )), width='stretch')
 
-        retention_n = st.selectbox("Number of donors to show in retention detail:", ['All', 10, 25, 50, 100], index=1, key="retention")
-        with st.expander("See retention donor detail", expanded=False):
-            st.dataframe(donor_dates.reset_index() if retention_n == 'All' else donor_dates.reset_index().head(retention_n))
+        detail_expander("See retention donor detail", "retention_detail", donor_dates.reset_index,
+                        sort_by='Gift Count', search_columns=['Donor'])
 
-    # --- Pareto Principle ---
-    with col2:
+
+@profiling.fragment
+def pareto_principle(version, donor_summary):
+    """Top donors by cumulative share, cut at the chosen target %."""
+    with profiling.section("Pareto Principle", rows=len(donor_summary)) as prof:
         st.subheader("📈 Pareto Principle (Top Donors)")
         st.markdown("""
         The Pareto Principle (also known as the 80/20 rule) suggests that roughly 80% of outcomes come from 20% of the causes. 
@@ -323,28 +283,130 @@ if 'donor_data' in st.session_state and not st.session_state['donor_data'].empty
         # Let user choose target cumulative donation percentage
         target_pct = st.slider("Target Cumulative % of Donations:", min_value=10, max_value=100, value=80, step=5)
 
-        pareto_df = df.groupby('Email')['Donation Amount'].sum().sort_values(ascending=False).reset_index()
-        pareto_df['Cumulative %'] = pareto_df['Donation Amount'].cumsum() / pareto_df['Donation Amount'].sum() * 100
-        pareto_df['Donor Rank'] = pareto_df.index + 1
+        pareto_df = analytics.pareto_table(version, donor_summary)
 
-        cutoff_index = pareto_df[pareto_df['Cumulative %'] <= target_pct].shape[0] + 1
+        cutoff_index = int((pareto_df['Cumulative %'] <= target_pct).sum()) + 1
         display_df = pareto_df.head(cutoff_index)
+        chart_df = charts.downsample(display_df)
 
-        bar = alt.Chart(display_df).mark_bar(opacity=0.7).encode(
+        bar = alt.Chart(chart_df).mark_bar(opacity=0.7).encode(
             x=alt.X('Donor Rank:O', title='Donors (ranked)'),
             y=alt.Y('Donation Amount:Q', title='Donation Amount'),
-            tooltip=['Email', 'Donation Amount']
+            tooltip=['Donor', 'Donation Amount']
         )
 
-        line = alt.Chart(display_df).mark_line(color='#FDBA21', point=True).encode(
+        line = alt.Chart(chart_df).mark_line(color='#FDBA21', point=True).encode(
             x='Donor Rank:O',
             y=alt.Y('Cumulative %:Q', axis=alt.Axis(title='Cumulative % of Donations')),
-            tooltip=['Email', 'Cumulative %']
+            tooltip=['Donor', 'Cumulative %']
         )
 
-        st.altair_chart((bar + line).resolve_scale(y='independent').properties(height=300), use_container_width=True)
-        with st.expander("See top donor breakdown table", expanded=False):
-            st.dataframe(display_df)
+        st.altair_chart(prof.chart((bar + line).resolve_scale(y='independent').properties(height=300)), width='stretch')
+        detail_expander("See top donor breakdown table", "pareto_detail", display_df,
+                        sort_by='Donor Rank', descending=False, search_columns=['Donor'])
+
+
+# ------------------------- DATA ANALYSIS AND DISPLAY ---------------------------------
+if 'donor_data' in st.session_state and not st.session_state['donor_data'].empty:
+    filters.sidebar()
+    approximate_toggle()
+    df = get_donor_data()
+    version = get_dataset_version()
+    donor_summary = get_donor_summary()
+    n_rows = len(df)
+    with profiling.section("Fundraising Over Time", rows=n_rows) as prof:
+        # --- Fundraising Trend ---
+        st.subheader("📅 Fundraising Over Time")
+        monthly_donations = charts.downsample(analytics.monthly_totals(version, df))
+
+        brush = alt.selection_interval(encodings=['x'])
+
+        base = alt.Chart(monthly_donations).encode(
+            x=alt.X('Month:T', title='Month'),
+            y=alt.Y('Cumulative Total:Q', title='Cumulative Donations'),
+            tooltip=['Month', 'Cumulative Total']
+        )
+
+        area = base.mark_area(opacity=0.3, color="#FDBA21").add_selection(brush)
+        line = base.mark_line(color='#F25C54', point=False)
+
+        # Define text for relative gain in highlighted region
+        start_value = alt.Chart(monthly_donations).transform_filter(brush).mark_rule(color='gray').encode(
+            x='min(Month):T'
+        )
+        end_value = alt.Chart(monthly_donations).transform_filter(brush).mark_rule(color='gray').encode(
+            x='max(Month):T'
+        )
+
+        summary_text = alt.Chart(monthly_donations).transform_filter(brush).transform_aggregate(
+            start_value='min(Cumulative Total)',
+            end_value='max(Cumulative Total)',
+            start_month='min(Month)',
+            end_month='max(Month)'
+        ).transform_calculate(
+            percent_increase='(datum.end_value - datum.start_value) / datum.start_value * 100',
+            formatted_text='"From " + timeFormat(datum.start_month, "%b %Y") + " to " + timeFormat(datum.end_month, "%b %Y") + ": +" + format(datum.percent_increase, ".1f") + "%"'
+        ).mark_text(
+            align='left',
+            baseline='top',
+            dx=15,
+            dy=10,
+            fontSize=14,
+            fontWeight='bold',
+            color='#1F3C4C'
+        ).encode(
+            x=alt.value(10),
+            y=alt.value(10),
+            text='formatted_text:N'
+        )
+
+        time_chart = (area + line + start_value + end_value + summary_text).properties(height=400)
+
+        st.altair_chart(prof.chart(time_chart.configure_view(
+            stroke=None,
+            fill='#ffffff'
+        ).configure_axis(
+            labelColor='#1F3C4C',
+            titleColor='#1F3C4C'
+        ).configure_title(color='#1F3C4C')), width='stretch')
+
+    with profiling.section("Key Metrics", rows=n_rows) as prof:
+        # --- Overview Stats ---
+        stats = analytics.overview_stats(version, df)
+        total_donations = stats['total_donations']
+        unique_donors = stats['unique_donors']
+        repeat_donors = stats['repeat_donors']
+        org_donors = stats['org_donors']
+
+        st.markdown("""<div class="metric-container">""", unsafe_allow_html=True)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Total Raised", f"${total_donations:,.0f}")
+        if approximate_counts():
+            unique_estimate, unique_error = sketch.count(get_donor_sketch())
+            col2.metric("Unique Donors", f"≈{unique_estimate:,.0f}",
+                        help=f"HyperLogLog estimate, ±{unique_error:,.0f} (one standard error)")
+        else:
+            col2.metric("Unique Donors", unique_donors)
+        col3.metric("Repeat Donors", repeat_donors)
+        col4.metric("Organizations", org_donors)
+
+    # --- Campaign Performance and Donor Demographics ---
+    # Sections with widgets are fragments, so a widget reruns only its own section
+    col1, col2 = st.columns(2)
+
+    with col1:
+        campaign_performance(version, df)
+
+    with col2:
+        donor_demographics(version, df)
+
+    # --- Retention Overview ---
+    with col1:
+        retention_signals(version, donor_summary)
+
+    # --- Pareto Principle ---
+    with col2:
+        pareto_principle(version, donor_summary)
 
 
 st.markdown("""
@@ -381,4 +443,6 @@ st.markdown("""
 </style>
 </div>
 """, unsafe_allow_html=True)
-st.markdown("<hr style='border-top: 3px solid #FDBA21; margin-top: -10px;'>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<hr style='border-top: 3px solid #FDBA21; margin-top: -10px;'>", unsafe_allow_html=True)
+
+profiling.panel()
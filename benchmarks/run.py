@@ -0,0 +1,155 @@
+"""Timed benchmarks for ingestion and the analysis behind every page.
+
+    python benchmarks/run.py [--rows 10000 100000 1000000] [--repeat 3] [--only ingest churn ...]
+
+Each size gets a synthetic export (benchmarks/synthetic.py), written once to
+benchmarks/.data/ and reused by later runs. Every benchmark is timed
+``--repeat`` times on a fresh dataset version, so the Streamlit caches never
+answer for it. Results are written as JSON to benchmarks/results/ for
+comparison across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import export_bytes, zip_centroids  # noqa: E402
+
+DATA_DIR = ROOT / 'benchmarks' / '.data'
+RESULTS_DIR = ROOT / 'benchmarks' / 'results'
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+
+# Isolate the parse cache and point the geocoder at centroids covering the synthetic ZIPs
+_scratch = tempfile.mkdtemp(prefix='cvc-bench-')
+os.environ['CVC_PARSE_CACHE_DIR'] = os.path.join(_scratch, 'parsed')
+os.environ.setdefault('CVC_ZIP_CENTROIDS', os.path.join(_scratch, 'centroids.csv'))
+zip_centroids().to_csv(os.path.join(_scratch, 'centroids.csv'), index=False)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from streamlit import logger as st_logger  # noqa: E402
+
+# Streamlit warns about the missing runtime on every cached function
+st_logger.set_log_level('error')
+
+from utils import analytics, parse_cache, partials  # noqa: E402
+from utils.dedupe import TransactionIndex  # noqa: E402
+from utils.donor_ids import DonorDictionary  # noqa: E402
+from utils.ingest import load_uploads  # noqa: E402
+from utils.schema import concat_frames  # noqa: E402
+from utils.summary import build_donor_summary  # noqa: E402
+
+
+def _ingest(data):
+    """Home.py upload path: parse, normalize, compact, assign donor IDs, skip duplicates and combine."""
+    dictionary = DonorDictionary()
+    transactions = TransactionIndex()
+    frames = []
+    for _, _, df, error in load_uploads([('export.xlsx', data)]):
+        if error is not None:
+            raise error
+        df['Donor ID'] = dictionary.encode(df)
+        frames.append(df[transactions.add('export.xlsx', df)])
+    return concat_frames(frames), dictionary
+
+
+def _clear_parse_cache():
+    for path in Path(parse_cache.CACHE_DIR).glob('*.parquet'):
+        path.unlink()
+
+
+def benchmarks(data):
+    """``{name: (setup, run)}``; setup runs untimed before each repetition."""
+    df, dictionary = _ingest(data)
+    summary = build_donor_summary(df, dictionary)
+    file_partials = [partials.file_partials(df)]
+    donor_sketch = partials.merge(file_partials, dictionary)['donor_sketch']
+    return {
+        'ingest': (_clear_parse_cache, lambda v: _ingest(data)),
+        'ingest_cached': (lambda: None, lambda v: _ingest(data)),
+        'donor_summary': (lambda: None, lambda v: build_donor_summary(df, dictionary)),
+        'file_partials': (lambda: None, lambda v: partials.file_partials(df)),
+        'merge_partials': (lambda: None, lambda v: partials.merge(file_partials, dictionary)),
+        'pareto': (lambda: None, lambda v: analytics.pareto_table(v, summary)),
+        'retention': (lambda: None, lambda v: analytics.retention_counts(v, summary)),
+        'churn': (lambda: None, lambda v: analytics.churn_table(v, df)),
+        'cohort_retention': (lambda: None, lambda v: analytics.cohort_table(v, df, 'retention')),
+        'cohort_monetary': (lambda: None, lambda v: analytics.cohort_table(v, df, 'monetary')),
+        'donor_sketch': (lambda: None, lambda v: analytics.donor_sketch(v, df)),
+        'cohort_retention_approx': (lambda: None, lambda v: analytics.approximate_cohort_retention(v, donor_sketch)),
+        'geocode': (lambda: None, lambda v: analytics.zip_geo_totals(v, df)),
+    }, len(df)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="export sizes to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument('--only', nargs='+', help="benchmark names to run (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, help="JSON output path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    results = []
+    for rows in args.rows:
+        print(f"== {rows:,} rows")
+        data = export_bytes(rows, args.seed, DATA_DIR)
+        cases, ingested_rows = benchmarks(data)
+        for name, (setup, run) in cases.items():
+            if args.only and name not in args.only:
+                continue
+            seconds = []
+            for i in range(args.repeat):
+                setup()
+                t0 = time.perf_counter()
+                run(f"bench-{rows}-{name}-{i}-{time.time_ns()}")
+                seconds.append(time.perf_counter() - t0)
+            results.append({
+                'benchmark': name,
+                'rows': rows,
+                'ingested_rows': ingested_rows,
+                'file_bytes': len(data),
+                'seconds': seconds,
+                'min': min(seconds),
+                'median': statistics.median(seconds),
+            })
+            print(f"{name:>14}  min {min(seconds):8.3f}s  median {statistics.median(seconds):8.3f}s")
+
+    report = {
+        'started': started.isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': {'pandas': pd.__version__, 'numpy': np.__version__},
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': results,
+    }
+    out = args.out or RESULTS_DIR / f"{started.strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {out}")
+
+
+if __name__ == '__main__':
+    main()
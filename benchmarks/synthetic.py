@@ -0,0 +1,104 @@
+"""Synthetic GiveButter exports for the benchmarks.
+
+The workbooks have the layout the dashboard ingests: a title row, then the
+export headers on row 2. Donor activity is skewed (a few donors give often,
+most give once or twice), about 10% of gifts come from organizations, and
+ZIPs arrive as the usual mix of ints, strings and ZIP+4.
+"""
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+EXPORT_COLUMNS = [
+    'Transaction ID', 'Transaction Date (UTC)', 'Amount', 'First Name', 'Last Name', 'Email',
+    'Business/Organization Name', 'Campaign Title', 'Postal Code',
+]
+CAMPAIGNS = ['Spring Gala', 'Year End Appeal', 'Giving Tuesday', 'Run for CVC', 'Scholarship Fund']
+FIRST_YEAR, LAST_YEAR = 2019, 2025
+ZIP_POOL = 2_000
+
+
+def zip_pool(seed=0):
+    """The five-digit ZIPs the generator draws from."""
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(np.arange(1_000, 99_950), ZIP_POOL, replace=False))
+
+
+def zip_centroids(seed=0):
+    """A centroid table (postal_code, latitude, longitude) covering zip_pool()."""
+    rng = np.random.default_rng(seed)
+    zips = zip_pool(seed)
+    return pd.DataFrame({
+        'postal_code': [f"{z:05d}" for z in zips],
+        'latitude': rng.uniform(25, 49, len(zips)).round(4),
+        'longitude': rng.uniform(-124, -67, len(zips)).round(4),
+    })
+
+
+def generate_export(rows, seed=0):
+    """A GiveButter-style export frame with ``rows`` transactions."""
+    rng = np.random.default_rng(seed)
+    donors = max(rows // 4, 1)
+    donor = np.minimum(rng.zipf(1.6, rows) - 1, donors - 1)
+    donor = rng.permutation(donors)[donor]
+    is_org = donor % 10 == 0
+
+    start = pd.Timestamp(f'{FIRST_YEAR}-01-01')
+    seconds = rng.integers(0, int((pd.Timestamp(f'{LAST_YEAR}-12-31') - start).total_seconds()), rows)
+    dates = start + pd.to_timedelta(seconds, unit='s')
+
+    years = dates.year.to_numpy()
+    campaign = rng.integers(0, len(CAMPAIGNS), rows)
+    with_year = rng.random(rows) < 0.8
+    titles = np.array(CAMPAIGNS, dtype=object)[campaign]
+    titles[with_year] = titles[with_year] + ' ' + years[with_year].astype(str)
+
+    zips = zip_pool(seed)[donor % ZIP_POOL]
+    zip_kind = rng.random(rows)
+    postal = zips.astype(object)
+    postal[zip_kind < 0.3] = np.char.zfill(zips[zip_kind < 0.3].astype(str), 5)
+    plus4 = zip_kind > 0.95
+    postal[plus4] = [f"{z:05d}-{rng.integers(1000, 9999)}" for z in zips[plus4]]
+    postal[zip_kind < 0.02] = None
+
+    emails = np.char.add(np.char.add('donor', donor.astype(str)), '@example.org').astype(object)
+    emails[is_org & (rng.random(rows) < 0.5)] = None
+
+    return pd.DataFrame({
+        'Transaction ID': np.char.add('txn_', np.arange(rows).astype(str)),
+        'Transaction Date (UTC)': dates,
+        'Amount': np.round(rng.lognormal(3.6, 1.1, rows), 2),
+        'First Name': np.where(is_org, None, 'Pat'),
+        'Last Name': np.where(is_org, None, 'Donor'),
+        'Email': emails,
+        'Business/Organization Name': np.where(is_org, np.char.add('Org ', (donor % 997).astype(str)), None),
+        'Campaign Title': titles,
+        'Postal Code': postal,
+    })[EXPORT_COLUMNS]
+
+
+def write_export(df, path):
+    """Write ``df`` as an .xlsx export: a title row, then headers on row 2."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Transactions')
+    sheet.append(['GiveButter Transactions Export'])
+    sheet.append(list(df.columns))
+    columns = [df[col].to_numpy(dtype=object) for col in df.columns]
+    for i, col in enumerate(df.columns):
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            columns[i] = df[col].dt.to_pydatetime().astype(object)
+    for row in zip(*columns):
+        sheet.append([None if v is None or (isinstance(v, float) and np.isnan(v)) else v for v in row])
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(path)
+    return path
+
+
+def export_bytes(rows, seed, cache_dir):
+    """Bytes of a synthetic export, written to ``cache_dir`` the first time it is needed."""
+    path = Path(cache_dir) / f"giving_{rows}_{seed}.xlsx"
+    if not path.exists():
+        write_export(generate_export(rows, seed), path)
+    return path.read_bytes()
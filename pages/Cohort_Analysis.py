@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import altair as alt
 
+from utils import analytics, charts, filters, profiling, snapshot
+from utils.session import approximate_counts, approximate_toggle, get_dataset_version, get_donor_data, get_donor_sketch
+
 st.set_page_config(page_title="Cohort Analysis Dashboard", layout="wide", page_icon="📊")
+profiling.begin("Cohort Analysis")
 
 # Use blue-green gradient background that echoes heatmaps
 st.markdown("""
@@ -25,6 +27,7 @@ h1, h2, h3 {
 st.title("📊 Cohort Analysis Dashboard")
 
 # --- Check if donor data exists
+snapshot.restore()
 if 'donor_data' not in st.session_state:
     st.warning("Please upload a donation file on the Home page first.")
     st.stop()
@@ -34,68 +37,55 @@ else:
     for fname in st.session_state.get('uploaded_file_names', []):
         st.sidebar.markdown(f"• `{fname}`")
 
-# --- Prepare Data
-df = st.session_state['donor_data'].copy()
-df = df.dropna(subset=['Date', 'Email'])
-
-df['Donation Quarter'] = df['Date'].dt.to_period('Q').dt.start_time
-df['Cohort Quarter'] = df.groupby('Email')['Donation Quarter'].transform('min')
-
-first_quarter = df['Donation Quarter'].min()
-last_quarter = df['Donation Quarter'].max()
-quarter_range = pd.period_range(start=first_quarter.to_period('Q'), end=last_quarter.to_period('Q'), freq='Q')
-total_quarters = len(quarter_range)
-
-quarter_index_map = {q.to_timestamp(): i for i, q in enumerate(quarter_range)}
-df['Global Quarter Index'] = df['Donation Quarter'].map(quarter_index_map)
-df['Cohort Start Index'] = df['Cohort Quarter'].map(quarter_index_map)
-df['Quarters Since First Donation'] = df['Global Quarter Index'] - df['Cohort Start Index']
-
-# --- NxN Retention Matrix
-cohort_retention = df.groupby(['Cohort Quarter', 'Quarters Since First Donation'])['Email'].nunique().unstack()
-cohort_retention = cohort_retention.reindex(columns=range(total_quarters), fill_value=np.nan)
-cohort_sizes = cohort_retention[0]
-retention_matrix = cohort_retention.divide(cohort_sizes, axis=0) * 100
-
-# Melt for Altair
-retention_reset = retention_matrix.reset_index().melt(
-    id_vars='Cohort Quarter', var_name='Quarter Index', value_name='Retention Rate (%)'
-)
-retention_reset['Cohort Label'] = retention_reset['Cohort Quarter'].dt.to_period('Q').astype(str)
-
-# --- Monetary Heatmap
-monetary_matrix = df.groupby(['Cohort Quarter', 'Quarters Since First Donation'])['Donation Amount'].sum().unstack()
-monetary_matrix = monetary_matrix.reindex(columns=range(total_quarters), fill_value=np.nan)
-
-monetary_reset = monetary_matrix.reset_index().melt(
-    id_vars='Cohort Quarter', var_name='Quarter Index', value_name='Monetary Value'
-)
-monetary_reset['Cohort Label'] = monetary_reset['Cohort Quarter'].dt.to_period('Q').astype(str)
+filters.sidebar()
+approximate_toggle()
+df = get_donor_data()
 
 # --- Chart Tabs
-tab1, tab2 = st.tabs(["📘 Retention Rate", "💵 Monetary Value"])
-
-with tab1:
-    st.subheader("📘 Donor Retention Heatmap")
-    chart1 = alt.Chart(retention_reset).mark_rect().encode(
-        x=alt.X('Quarter Index:O', title='Quarters Since First Donation'),
-        y=alt.Y('Cohort Label:N', title='Cohort Start Quarter'),
-        color=alt.Color('Retention Rate (%):Q', scale=alt.Scale(scheme='blues'), legend=alt.Legend(title='Retention %')),
-        tooltip=['Cohort Label', 'Quarter Index', 'Retention Rate (%)']
-    ).properties(width=700, height=400)
-
-    st.altair_chart(chart1.configure_axis(labelColor='#1F3C4C', titleColor='#1F3C4C'), use_container_width=True)
-
-with tab2:
-    st.subheader("💵 Monetary Retention Heatmap")
-    chart2 = alt.Chart(monetary_reset).mark_rect().encode(
-        x=alt.X('Quarter Index:O', title='Quarters Since First Donation'),
-        y=alt.Y('Cohort Label:N', title='Cohort Start Quarter'),
-        color=alt.Color('Monetary Value:Q', scale=alt.Scale(scheme='greens'), legend=alt.Legend(title='Total $ Donated')),
-        tooltip=['Cohort Label', 'Quarter Index', 'Monetary Value']
-    ).properties(width=700, height=400)
-
-    st.altair_chart(chart2.configure_axis(labelColor='#1F3C4C', titleColor='#1F3C4C'), use_container_width=True)
+# Only the open tab's heatmap is computed; switching tabs reruns just this fragment
+@profiling.fragment
+def cohort_heatmaps(version, df):
+    """Retention and monetary heatmap tabs."""
+    tab1, tab2 = st.tabs(["📘 Retention Rate", "💵 Monetary Value"], key="cohort_tab", on_change="rerun")
+
+    if tab1.open:
+        with tab1, profiling.section("Cohort Retention", rows=len(df)) as prof:
+            st.subheader("📘 Donor Retention Heatmap")
+            # Distinct donors per cohort and quarter, from integer quarter codes, or estimated
+            # from the donor sketches in approximate mode.
+            # Only the most recent cohorts are drawn once a heatmap exceeds the chart row budget
+            tooltip = ['Cohort Label', 'Quarter Index', 'Retention Rate (%)']
+            if approximate_counts():
+                retention = analytics.approximate_cohort_retention(version, get_donor_sketch())
+                tooltip.append('Margin (± pts)')
+                st.caption("≈ Estimated from HyperLogLog sketches; hover a cell for its margin (one standard error).")
+            else:
+                retention = analytics.cohort_table(version, df, 'retention')
+            retention_reset = charts.latest_groups(retention, 'Cohort Label')
+            chart1 = alt.Chart(retention_reset).mark_rect().encode(
+                x=alt.X('Quarter Index:O', title='Quarters Since First Donation'),
+                y=alt.Y('Cohort Label:N', title='Cohort Start Quarter'),
+                color=alt.Color('Retention Rate (%):Q', scale=alt.Scale(scheme='blues'), legend=alt.Legend(title='Retention %')),
+                tooltip=tooltip
+            ).properties(width=700, height=400)
+
+            st.altair_chart(prof.chart(chart1.configure_axis(labelColor='#1F3C4C', titleColor='#1F3C4C')), width='stretch')
+
+    if tab2.open:
+        with tab2, profiling.section("Cohort Monetary Value", rows=len(df)) as prof:
+            st.subheader("💵 Monetary Retention Heatmap")
+            monetary_reset = charts.latest_groups(analytics.cohort_table(version, df, 'monetary'), 'Cohort Label')
+            chart2 = alt.Chart(monetary_reset).mark_rect().encode(
+                x=alt.X('Quarter Index:O', title='Quarters Since First Donation'),
+                y=alt.Y('Cohort Label:N', title='Cohort Start Quarter'),
+                color=alt.Color('Monetary Value:Q', scale=alt.Scale(scheme='greens'), legend=alt.Legend(title='Total $ Donated')),
+                tooltip=['Cohort Label', 'Quarter Index', 'Monetary Value']
+            ).properties(width=700, height=400)
+
+            st.altair_chart(prof.chart(chart2.configure_axis(labelColor='#1F3C4C', titleColor='#1F3C4C')), width='stretch')
+
+
+cohort_heatmaps(get_dataset_version(), df)
 
 # --- Insight Text
 st.markdown("""
@@ -111,3 +101,5 @@ Use these to:
 - Spot seasonal giving patterns.
 - Prioritize stewardship of high-value cohorts.
 """)
+
+profiling.panel()
@@ -1,11 +1,14 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
 import plotly.express as px
-import pgeocode
+
+from utils import analytics, filters, profiling, snapshot
+from utils.geocode import DEFAULT_CENTROIDS_PATH
+from utils.session import get_dataset_version, get_donor_data
 
 # Page setup
 st.set_page_config(page_title="Donor Demographics Dashboard", layout="wide", page_icon="🌍")
+profiling.begin("Donor Demographics")
 st.title("🌍 Donor Demographics Dashboard")
 
 # Style
@@ -21,7 +24,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load data
-# Load data  
+snapshot.restore()
 if 'donor_data' not in st.session_state:
     st.warning("Please upload a donation file on the Home page first.")
     st.stop()
@@ -31,73 +34,70 @@ else:
     for fname in st.session_state['uploaded_file_names']:
         st.sidebar.markdown(f"• `{fname}`")
         
-df = st.session_state['donor_data'].copy()
-df = df.dropna(subset=['Donation Amount'])
+filters.sidebar()
+df = get_donor_data()
+version = get_dataset_version()
+n_rows = len(df)
 
 # ----- Donor Type Pie Chart -----
-st.subheader("🧑‍🤝‍🧑 Donor Type Distribution")
+with profiling.section("Donor Type Distribution", rows=n_rows) as prof:
+    st.subheader("🧑‍🤝‍🧑 Donor Type Distribution")
 
-if 'Donor Type' in df.columns:
-    type_counts = df['Donor Type'].value_counts().reset_index()
-    type_counts.columns = ['Donor Type', 'Count']
+    if 'Donor Type' in df.columns:
+        type_counts = analytics.donor_type_counts(version, df)
+        type_counts.columns = ['Donor Type', 'Count']
 
-    type_pie = alt.Chart(type_counts).mark_arc(innerRadius=50).encode(
-        theta=alt.Theta(field="Count", type="quantitative"),
-        color=alt.Color(field="Donor Type", type="nominal"),
-        tooltip=['Donor Type', 'Count']
-    ).properties(height=300)
+        type_pie = alt.Chart(type_counts).mark_arc(innerRadius=50).encode(
+            theta=alt.Theta(field="Count", type="quantitative"),
+            color=alt.Color(field="Donor Type", type="nominal"),
+            tooltip=['Donor Type', 'Count']
+        ).properties(height=300)
 
-    st.altair_chart(type_pie.configure_legend(labelColor='#1F3C4C'), use_container_width=True)
+        st.altair_chart(prof.chart(type_pie.configure_legend(labelColor='#1F3C4C')), width='stretch')
 
 # ----- ZIP Code Analytics -----
 st.subheader("📍 ZIP Code-Based Donation Insights")
 col1, col2 = st.columns(2)
 
 with col1:
-    st.markdown("#### 💵 Top ZIP Codes by Donation Amount")
-    if 'ZIP' in df.columns:
-        df['ZIP'] = df['ZIP'].astype(str).str.zfill(5)
-        zip_df = df.groupby('ZIP')['Donation Amount'].sum().reset_index()
-        zip_df = zip_df.sort_values(by='Donation Amount', ascending=False).head(20)
-
-        bar = alt.Chart(zip_df).mark_bar().encode(
-            y=alt.Y('ZIP:N', sort='-x'),
-            x=alt.X('Donation Amount:Q'),
-            tooltip=['ZIP', 'Donation Amount']
-        ).properties(height=400)
-
-        st.altair_chart(bar, use_container_width=True)
-    else:
-        st.warning("ZIP column not found in data.")
+    with profiling.section("Top ZIP Codes", rows=n_rows) as prof:
+        st.markdown("#### 💵 Top ZIP Codes by Donation Amount")
+        if 'ZIP' in df.columns:
+            zip_df = analytics.zip5_totals(version, df).head(20)
+
+            bar = alt.Chart(zip_df).mark_bar().encode(
+                y=alt.Y('ZIP:N', sort='-x'),
+                x=alt.X('Donation Amount:Q'),
+                tooltip=['ZIP', 'Donation Amount']
+            ).properties(height=400)
+
+            st.altair_chart(prof.chart(bar), width='stretch')
+        else:
+            st.warning("ZIP column not found in data.")
 
 with col2:
-    st.markdown("#### 🗺️ Geographic Distribution of Donations")
-
-    if 'ZIP' in df.columns:
-        df['ZIP'] = df['ZIP'].astype(str).str.zfill(5)
-        nomi = pgeocode.Nominatim('us')
-        zip_list = df['ZIP'].unique()
-
-        geo_data = pd.DataFrame([nomi.query_postal_code(z) for z in zip_list])
-        geo_data = geo_data[['postal_code', 'latitude', 'longitude']].dropna()
-        geo_data.columns = ['ZIP', 'Latitude', 'Longitude']
-        geo_data['ZIP'] = geo_data['ZIP'].astype(str).str.zfill(5)
-
-        donation_by_zip = df.groupby('ZIP')['Donation Amount'].sum().reset_index()
-        geo_df = pd.merge(donation_by_zip, geo_data, on='ZIP', how='inner')
-
-        fig = px.scatter_geo(
-            geo_df,
-            lat='Latitude',
-            lon='Longitude',
-            scope="usa",
-            color='Donation Amount',
-            hover_name='ZIP',
-            size='Donation Amount',
-            color_continuous_scale='Oranges',
-        )
-
-        fig.update_layout(height=400, margin={"r":0,"t":0,"l":0,"b":0})
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("ZIP code data not available.")
+    with profiling.section("Geographic Distribution", rows=n_rows) as prof:
+        st.markdown("#### 🗺️ Geographic Distribution of Donations")
+
+        if 'ZIP' in df.columns:
+            geo_df = analytics.zip_geo_totals(version, df)
+            if geo_df is None:
+                st.info(f"ZIP centroid table not found. Run `python scripts/seed_zip_centroids.py` or place it at `{DEFAULT_CENTROIDS_PATH}`.")
+            else:
+                fig = px.scatter_geo(
+                    geo_df,
+                    lat='Latitude',
+                    lon='Longitude',
+                    scope="usa",
+                    color='Donation Amount',
+                    hover_name='ZIP',
+                    size='Donation Amount',
+                    color_continuous_scale='Oranges',
+                )
+
+                fig.update_layout(height=400, margin={"r":0,"t":0,"l":0,"b":0})
+                st.plotly_chart(prof.chart(fig), width='stretch')
+        else:
+            st.info("ZIP code data not available.")
+
+profiling.panel()
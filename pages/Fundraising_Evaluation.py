@@ -2,7 +2,11 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
+from utils import analytics, charts, filters, profiling, snapshot
+from utils.session import get_dataset_version, get_donor_data
+
 st.set_page_config(page_title="Fundraising Evaluation", layout="wide", page_icon="📈")
+profiling.begin("Fundraising Evaluation")
 st.title("📈 Fundraising Evaluation")
 
 # -- Style --
@@ -18,6 +22,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # -- Load data --
+snapshot.restore()
 if 'donor_data' not in st.session_state:
     st.warning("Please upload a donation file on the Home page first.")
     st.stop()
@@ -28,112 +33,112 @@ else:
         st.sidebar.markdown(f"• `{fname}`")
 
 
-df = st.session_state['donor_data'].copy()
-df = df.dropna(subset=['Date', 'Donation Amount'])
+filters.sidebar()
+df = get_donor_data()
+version = get_dataset_version()
+n_rows = len(df)
 
 # -- Section: Fundraising by Campaign --
-st.subheader("🎯 Total Raised & Average Gift by Campaign")
-
-campaign_df = df.groupby("Campaign Title")["Donation Amount"].agg(['sum', 'mean', 'count']).reset_index()
-campaign_df.rename(columns={"sum": "Total Raised", "mean": "Average Gift", "count": "Donations"}, inplace=True)
-
-# Add this to handle NaNs
-campaign_df = campaign_df.fillna(0)
-
-col1, col2 = st.columns(2)
-with col1:
-    st.altair_chart(
-        alt.Chart(campaign_df).mark_bar().encode(
-            x=alt.X("Total Raised:Q", title="Total Raised"),
-            y=alt.Y("Campaign Title:N", sort='-x'),
-            tooltip=["Campaign Title", "Total Raised"]
-        ).properties(height=350),
-        use_container_width=True
-    )
-
-with col2:
-    st.altair_chart(
-        alt.Chart(campaign_df).mark_bar(color="#6096BA").encode(
-            x=alt.X("Average Gift:Q", title="Average Gift ($)"),
-            y=alt.Y("Campaign Title:N", sort='-x'),
-            tooltip=["Campaign Title", "Average Gift"]
-        ).properties(height=350),
-        use_container_width=True
-    )
+with profiling.section("Campaign Performance", rows=n_rows) as prof:
+    st.subheader("🎯 Total Raised & Average Gift by Campaign")
+
+    campaign_df = analytics.campaign_summary(version, df, dated_only=True).rename(columns={"Donation Count": "Donations"})
+
+    # Add this to handle NaNs
+    campaign_df = charts.top_rows(campaign_df.fillna(0), "Total Raised")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.altair_chart(prof.chart(
+            alt.Chart(campaign_df).mark_bar().encode(
+                x=alt.X("Total Raised:Q", title="Total Raised"),
+                y=alt.Y("Campaign Title:N", sort='-x'),
+                tooltip=["Campaign Title", "Total Raised"]
+            ).properties(height=350)),
+            width='stretch'
+        )
+
+    with col2:
+        st.altair_chart(prof.chart(
+            alt.Chart(campaign_df).mark_bar(color="#6096BA").encode(
+                x=alt.X("Average Gift:Q", title="Average Gift ($)"),
+                y=alt.Y("Campaign Title:N", sort='-x'),
+                tooltip=["Campaign Title", "Average Gift"]
+            ).properties(height=350)),
+            width='stretch'
+        )
 
 # -- Section: Donation Amount Distribution --
-st.subheader("💸 Donation Size Distribution")
-
-bin_width = st.slider("Select bin width for histogram ($):", 5, 500, 50, step=5)
-hist_data = df[df["Donation Amount"] <= 1000]  # Filter out outliers for visualization
+# Sections with widgets are fragments, so a widget reruns only its own section
+@profiling.fragment
+def donation_size_distribution(version, df):
+    """Histogram of gift amounts at the chosen bin width."""
+    with profiling.section("Donation Size Distribution", rows=len(df)) as prof:
+        st.subheader("💸 Donation Size Distribution")
 
-hist = alt.Chart(hist_data).mark_bar(opacity=0.7).encode(
-    alt.X("Donation Amount:Q", bin=alt.Bin(step=bin_width), title="Donation Amount ($)"),
-    alt.Y("count()", title="Frequency"),
-    tooltip=["count()"]
-).properties(height=350)
+        bin_width = st.slider("Select bin width for histogram ($):", 5, 500, 50, step=5)
+        hist_data = analytics.amount_histogram(version, df, 1000, bin_width)  # Filter out outliers for visualization
 
-st.altair_chart(hist, use_container_width=True)
-
-# -- Section: Cumulative Fundraising Trend --
-st.subheader("📈 Fundraising Over Time")
+        hist = alt.Chart(hist_data).mark_bar(opacity=0.7).encode(
+            alt.X("Bin Start:Q", title="Donation Amount ($)"),
+            alt.X2("Bin End:Q"),
+            alt.Y("Frequency:Q", title="Frequency"),
+            tooltip=["Bin Start", "Bin End", "Frequency"]
+        ).properties(height=350)
 
-df['Month'] = df['Date'].dt.to_period('M').dt.to_timestamp()
-monthly = df.groupby('Month')['Donation Amount'].sum().reset_index()
-monthly['Cumulative'] = monthly['Donation Amount'].cumsum()
+        st.altair_chart(prof.chart(hist), width='stretch')
 
-line = alt.Chart(monthly).mark_line(point=True).encode(
-    x=alt.X("Month:T", title="Month"),
-    y=alt.Y("Cumulative:Q", title="Cumulative Donations"),
-    tooltip=["Month", "Cumulative"]
-).properties(height=350)
 
-st.altair_chart(line, use_container_width=True)
+donation_size_distribution(version, df)
 
-import re
+# -- Section: Cumulative Fundraising Trend --
+with profiling.section("Fundraising Over Time", rows=n_rows) as prof:
+    st.subheader("📈 Fundraising Over Time")
 
-# -- Section: Year-over-Year Growth by Campaign --
-st.subheader("📊 Year-over-Year (YoY) Growth by Campaign")
+    monthly = analytics.monthly_totals(version, df).rename(columns={'Cumulative Total': 'Cumulative'})
+    monthly = charts.downsample(monthly)
 
-# Use correct date column and ensure datetime
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-df['Donation Year'] = df['Date'].dt.year
+    line = alt.Chart(monthly).mark_line(point=True).encode(
+        x=alt.X("Month:T", title="Month"),
+        y=alt.Y("Cumulative:Q", title="Cumulative Donations"),
+        tooltip=["Month", "Cumulative"]
+    ).properties(height=350)
 
-# Determine which campaign column exists
-campaign_col = 'Campaign' if 'Campaign' in df.columns else 'Campaign Title'
+    st.altair_chart(prof.chart(line), width='stretch')
 
-if campaign_col in df.columns:
-    # Strip year from campaign names
-    def clean_campaign(name):
-        return re.sub(r'\s*\d{4}$', '', str(name))  # Remove 4-digit year at the end
+# -- Section: Year-over-Year Growth by Campaign --
+@profiling.fragment
+def year_over_year_growth(version, df):
+    """Yearly totals for the selected campaign."""
+    with profiling.section("Year-over-Year Growth", rows=len(df)) as prof:
+        st.subheader("📊 Year-over-Year (YoY) Growth by Campaign")
 
-    df['Campaign Clean'] = df[campaign_col].apply(clean_campaign)
+        # Donations per campaign (year stripped from the name) and year, built once per dataset
+        yoy_cube = analytics.yoy_cube(version, df)
 
-    # Group by cleaned name and year
-    yoy_df = df.groupby(['Campaign Clean', 'Donation Year'])['Donation Amount'].sum().reset_index()
+        # Campaign selector
+        selected_campaign = st.selectbox("Select a Campaign", yoy_cube.index)
 
-    # Fill missing combinations with 0s
-    all_years = sorted(df['Donation Year'].dropna().unique())
-    all_campaigns = df['Campaign Clean'].dropna().unique()
-    full_index = pd.MultiIndex.from_product([all_campaigns, all_years], names=['Campaign Clean', 'Donation Year'])
-    yoy_df = yoy_df.set_index(['Campaign Clean', 'Donation Year']).reindex(full_index, fill_value=0).reset_index()
+        # The selected campaign is one row of the cube
+        if selected_campaign is None:
+            filtered_df = pd.DataFrame(columns=['Campaign Clean', 'Donation Year', 'Donation Amount'])
+        else:
+            filtered_df = yoy_cube.loc[selected_campaign].rename('Donation Amount').reset_index()
+            filtered_df.insert(0, 'Campaign Clean', selected_campaign)
 
-    # Campaign selector
-    selected_campaign = st.selectbox("Select a Campaign", sorted(all_campaigns))
+        # Bar chart
+        bar_chart = alt.Chart(filtered_df).mark_bar(color="#F57C00").encode(
+            x=alt.X('Donation Year:O', title='Year'),
+            y=alt.Y('Donation Amount:Q', title='Total Donations'),
+            tooltip=['Campaign Clean', 'Donation Year', 'Donation Amount']
+        ).properties(
+            title=f"Year-over-Year Donations: {selected_campaign}",
+            height=400
+        )
 
-    filtered_df = yoy_df[yoy_df['Campaign Clean'] == selected_campaign]
+        st.altair_chart(prof.chart(bar_chart), width='stretch')
 
-    # Bar chart
-    bar_chart = alt.Chart(filtered_df).mark_bar(color="#F57C00").encode(
-        x=alt.X('Donation Year:O', title='Year'),
-        y=alt.Y('Donation Amount:Q', title='Total Donations'),
-        tooltip=['Campaign Clean', 'Donation Year', 'Donation Amount']
-    ).properties(
-        title=f"Year-over-Year Donations: {selected_campaign}",
-        height=400
-    )
 
-    st.altair_chart(bar_chart, use_container_width=True)
+year_over_year_growth(version, df)
 
-else:
-    st.warning("No campaign column found in data.")
+profiling.panel()
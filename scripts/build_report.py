@@ -0,0 +1,65 @@
+"""Run the dashboard analytics headlessly on a directory of GiveButter exports.
+
+    python scripts/build_report.py EXPORTS_DIR [--out REPORT_DIR]
+
+Exports are parsed in parallel, combined as the dashboard would combine them
+(skipping transactions repeated from an earlier export) and analyzed once. The results are written as Parquet files plus a static
+report.html to REPORT_DIR/<content key>/ (default: reports/, or
+CVC_REPORT_DIR). A dashboard pointed at the same directory loads them as soon
+as the same exports are uploaded, instead of recomputing.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import artifacts  # noqa: E402
+from utils.dedupe import TransactionIndex  # noqa: E402
+from utils.donor_ids import DonorDictionary  # noqa: E402
+from utils.ingest import load_uploads  # noqa: E402
+from utils.report import build_artifacts, render_html  # noqa: E402
+from utils.schema import concat_frames  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('exports', type=Path, help="directory of GiveButter .xlsx exports")
+    parser.add_argument('--out', type=Path, default=artifacts.REPORT_DIR, help="report directory")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in args.exports.glob('*.xlsx') if not p.name.startswith('~$'))
+    if not paths:
+        sys.exit(f"No .xlsx exports found in {args.exports}")
+
+    started = time.perf_counter()
+    dictionary = DonorDictionary()
+    transactions = TransactionIndex()
+    frames, hashes, names = [], [], []
+    for name, file_hash, df, error in load_uploads([(p.name, p.read_bytes()) for p in paths]):
+        if error is not None:
+            print(f"Skipping {name}: {error}", file=sys.stderr)
+            continue
+        df['Donor ID'] = dictionary.encode(df)
+        keep = transactions.add(name, df)
+        if not keep.all():
+            print(f"{name}: skipped {len(df) - keep.sum():,} duplicate rows", file=sys.stderr)
+            df = df[keep].reset_index(drop=True)
+        frames.append(df)
+        hashes.append(file_hash)
+        names.append(name)
+    if not frames:
+        sys.exit("None of the exports could be processed")
+
+    df = concat_frames(frames)
+    key = artifacts.content_key(hashes)
+    results = build_artifacts(key, df, dictionary)
+    out = artifacts.write(key, results, args.out)
+    (out / 'report.html').write_text(render_html(results, names), encoding='utf-8')
+    print(f"Analyzed {len(df):,} rows from {len(names)} export(s) in {time.perf_counter() - started:.1f}s")
+    print(f"Wrote {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Seed data/us_zip_centroids.csv for the offline geocoder.
+
+Run once on a machine with internet access, then copy the file to the
+dashboard host:
+
+    python scripts/seed_zip_centroids.py [output.csv]
+
+If a pgeocode cache (~/.cache/pgeocode/US.txt) already exists it is reused
+instead of downloading.
+"""
+import io
+import sys
+import urllib.request
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.geocode import DEFAULT_CENTROIDS_PATH, centroid_paths  # noqa: E402
+
+GEONAMES_URL = 'https://download.geonames.org/export/zip/US.zip'
+GEONAMES_FIELDS = [
+    'country_code', 'postal_code', 'place_name', 'state_name', 'state_code', 'county_name',
+    'county_code', 'community_name', 'community_code', 'latitude', 'longitude', 'accuracy'
+]
+
+
+def download_geonames():
+    with urllib.request.urlopen(GEONAMES_URL) as res:
+        with zipfile.ZipFile(io.BytesIO(res.read())) as archive:
+            with archive.open('US.txt') as fh:
+                return pd.read_csv(fh, sep='\t', header=None, names=GEONAMES_FIELDS, dtype={'postal_code': str})
+
+
+def main():
+    out = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CENTROIDS_PATH
+    pgeocode_cache = centroid_paths()[-1]
+    if pgeocode_cache.exists():
+        data = pd.read_csv(pgeocode_cache, dtype={'postal_code': str})
+    else:
+        data = download_geonames()
+
+    table = data[['postal_code', 'latitude', 'longitude']].dropna()
+    table['postal_code'] = table['postal_code'].str.zfill(5)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    table.drop_duplicates('postal_code').to_csv(out, index=False, float_format='%.4f')
+    print(f"Wrote {len(table):,} ZIP centroids to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""Shared fixtures: synthetic exports (benchmarks/synthetic.py) and isolated on-disk caches."""
+import pytest
+
+from benchmarks.synthetic import generate_export, write_export
+from utils import ingest, parse_cache, snapshot
+
+
+@pytest.fixture(autouse=True)
+def parse_cache_dir(tmp_path, monkeypatch):
+    """A parse cache and snapshot directory of the test's own, and no process pool."""
+    monkeypatch.setattr(parse_cache, 'CACHE_DIR', tmp_path / 'parsed')
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', tmp_path / 'snapshots')
+    monkeypatch.setattr(ingest, 'INGEST_WORKERS', 1)
+    return tmp_path / 'parsed'
+
+
+@pytest.fixture
+def export(tmp_path):
+    """``export(frame)`` or ``export(rows, seed)``: the bytes of an .xlsx export."""
+    def make(rows_or_frame, seed=0):
+        frame = rows_or_frame if hasattr(rows_or_frame, 'columns') else generate_export(rows_or_frame, seed)
+        path = tmp_path / 'exports' / f"export_{len(list(tmp_path.glob('exports/*')))}.xlsx"
+        return write_export(frame, path).read_bytes()
+    return make
+
+
+@pytest.fixture
+def upload(export):
+    """``upload(frame, name)``: an upload for AppTest's file_uploader."""
+    def make(frame, name):
+        return name, export(frame), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return make
@@ -0,0 +1,28 @@
+import json
+
+import pandas as pd
+
+from utils import artifacts
+
+
+def test_content_key_ignores_order_but_not_the_schema(monkeypatch):
+    key = artifacts.content_key(['a', 'b'])
+    assert key == artifacts.content_key(['b', 'a'])
+    monkeypatch.setattr(artifacts, 'INGEST_SCHEMA_KEY', 'older-schema')
+    assert artifacts.content_key(['a', 'b']) != key
+
+
+def test_reports_built_by_other_code_are_ignored(tmp_path, monkeypatch):
+    frames = {'campaign_summary': pd.DataFrame({'Campaign Title': ['Gala'], 'Total Raised': [10.0]})}
+    key = artifacts.content_key(['a'])
+    out = artifacts.write(key, frames, tmp_path)
+    pd.testing.assert_frame_equal(artifacts.read(key, tmp_path)['campaign_summary'], frames['campaign_summary'])
+
+    monkeypatch.setattr(artifacts, 'FORMAT', artifacts.FORMAT + 1)
+    assert artifacts.read(key, tmp_path) is None
+    monkeypatch.undo()
+
+    manifest = json.loads((out / 'manifest.json').read_text())
+    del manifest['ingest_schema']
+    (out / 'manifest.json').write_text(json.dumps(manifest))
+    assert artifacts.read(key, tmp_path) is None
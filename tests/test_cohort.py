@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic import generate_export
+from utils import cohort
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_retention_matrix_counts_each_cohorts_returning_donors():
+    # Donor 0 gives in quarters 0 and 2, donor 1 in 1 and 2, donor 2 only in 2
+    first_quarter, counts = cohort.retention_matrix(np.array([0, 0, 0, 1, 1, 2]), np.array([8040, 8042, 8042, 8041, 8042, 8042]))
+    assert first_quarter == 8040
+    assert counts.tolist() == [[1, 0, 1], [1, 1, 0], [1, 0, 0]]
+    frame = cohort.retention_frame(first_quarter, counts)
+    assert frame['Cohort Label'].tolist() == ['2010Q1', '2010Q1', '2010Q2', '2010Q2', '2010Q3']
+    assert frame['Retention Rate (%)'].tolist() == [100.0, 100.0, 100.0, 100.0, 100.0]
+
+
+def test_frames_of_empty_matrices_are_empty():
+    empty = np.zeros((0, 0), dtype=np.int64)
+    assert cohort.retention_frame(0, empty).empty
+    assert cohort.retention_frame(0, empty, np.zeros((0, 0))).columns[-1] == 'Margin (± pts)'
+    assert cohort.monetary_frame(0, empty, np.zeros((0, 0))).empty
+
+
+def test_cohort_page_with_undated_export(upload):
+    frame = generate_export(200, seed=10)
+    frame['Transaction Date (UTC)'] = None
+    at = AppTest.from_file(str(ROOT / 'Home.py'), default_timeout=120).run()
+    at.sidebar.file_uploader[0].set_value([upload(frame, 'undated.xlsx')]).run()
+    assert not at.exception, [e.value for e in at.exception]
+
+    at.switch_page('pages/Cohort_Analysis.py').run()
+    assert not at.exception, [e.value for e in at.exception]
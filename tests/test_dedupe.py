@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic import generate_export
+from utils import snapshot
+from utils.dedupe import TransactionIndex, transaction_keys
+
+HOME = str(Path(__file__).resolve().parents[1] / 'Home.py')
+
+
+def test_numeric_and_text_ids_share_a_key():
+    numbers = pd.DataFrame({'Transaction ID': [101.0, 102.0], 'Donation Amount': [5.0, 6.0]})
+    text = pd.DataFrame({'Transaction ID': ['101', ' 102 '], 'Donation Amount': [5.0, 6.0]})
+    assert (transaction_keys(numbers) == transaction_keys(text)).all()
+
+
+def test_index_skips_transactions_an_earlier_file_has():
+    df = pd.DataFrame({'Transaction ID': ['t1', 't2', 't3', 't3'], 'Donation Amount': [1.0, 2.0, 3.0, 3.0]})
+    index = TransactionIndex()
+    assert index.add('a', df.iloc[:2]).all()
+    # Repeats within one file are kept, repeats of file a are not
+    assert index.add('b', df.iloc[1:]).tolist() == [False, True, True]
+    assert index.skipped == {'a': 0, 'b': 1}
+    assert index.dependents() == ['b']
+
+    index.remove('a')
+    assert index.dependents() == ['b']
+    index.remove('b')
+    assert index.add('b', df.iloc[1:]).all()
+
+
+def _overview(at):
+    return {m.label: m.value for m in at.metric}
+
+
+def _upload(at, uploads):
+    at.sidebar.file_uploader[0].set_value(uploads).run()
+    assert not at.exception, [e.value for e in at.exception]
+    return _overview(at)
+
+
+@pytest.mark.parametrize('order', ['together', 'one_by_one'])
+def test_removing_an_overlapping_file_gives_back_the_other_files_totals(upload, order, monkeypatch):
+    # Every AppTest below must start empty, not from the snapshot an earlier one left
+    monkeypatch.setattr(snapshot, 'ENABLED', False)
+    frame = generate_export(300, seed=3)
+    other = generate_export(100, seed=4)
+    other['Transaction ID'] = 'other_' + other['Transaction ID']
+    a = upload(frame.iloc[:200], 'a.xlsx')
+    b = upload(frame.iloc[100:].reset_index(drop=True), 'b.xlsx')
+    # Stays loaded, so b's reload (a parse cache hit) is combined with freshly parsed rows
+    c = upload(other, 'c.xlsx')
+
+    at = AppTest.from_file(HOME, default_timeout=120).run()
+    if order == 'one_by_one':
+        _upload(at, [a])
+        _upload(at, [a, c])
+    both = _upload(at, [a, b, c])
+    remaining = _upload(at, [b, c])
+
+    assert both == _upload(AppTest.from_file(HOME, default_timeout=120).run(),
+                           [upload(pd.concat([frame, other]), 'all.xlsx')])
+    assert remaining == _upload(AppTest.from_file(HOME, default_timeout=120).run(), [b, c])
+    total = float(remaining['Total Raised'].strip('$').replace(',', ''))
+    assert np.isclose(total, frame.iloc[100:]['Amount'].sum() + other['Amount'].sum(), atol=0.5)
@@ -0,0 +1,42 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic import generate_export
+
+HOME = str(Path(__file__).resolve().parents[1] / 'Home.py')
+
+
+def _retention_page(upload, frame):
+    at = AppTest.from_file(HOME, default_timeout=120).run()
+    at.sidebar.file_uploader[0].set_value([upload(frame, 'export.xlsx')]).run()
+    at.switch_page('pages/Donor_Retention.py').run()
+    assert not at.exception, [e.value for e in at.exception]
+    return at
+
+
+def _churn_info(at):
+    return [i.value for i in at.info if i.value.startswith('Churn needs')]
+
+
+def test_churn_shows_for_the_whole_range(upload):
+    at = _retention_page(upload, generate_export(300, seed=14))
+    assert not _churn_info(at)
+    assert len(at.dataframe) >= 1
+
+
+@pytest.mark.parametrize('dates', [(date(2022, 1, 1), date(2022, 2, 28)), (date(2022, 3, 1), date(2022, 3, 31))])
+def test_filter_inside_one_quarter_explains_missing_churn(upload, dates):
+    at = _retention_page(upload, generate_export(300, seed=14))
+    at.sidebar.date_input(key='filter_dates').set_value(dates).run()
+    assert not at.exception, [e.value for e in at.exception]
+    assert at.session_state['data_filter'].start == dates[0]
+    assert _churn_info(at)
+
+
+def test_undated_export_explains_missing_churn(upload):
+    frame = generate_export(200, seed=15)
+    frame['Transaction Date (UTC)'] = None
+    assert _churn_info(_retention_page(upload, frame))
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_export
+from utils import ingest, parse_cache
+from utils.ingest import iter_workbook_chunks, read_workbook
+from utils.schema import SchemaError
+from utils.schema import concat_frames
+
+
+def test_streamed_chunks_with_mixed_zip_types_concatenate_and_cache(export):
+    frame = generate_export(120, seed=3)
+    # Whole-number ZIPs in the first chunk, text in the second
+    frame['Postal Code'] = [12345] * 60 + ['02139-4307'] * 60
+    chunks = list(iter_workbook_chunks(export(frame), chunk_rows=60))
+    assert len(chunks) == 2
+
+    df = concat_frames(chunks)
+    assert df['ZIP'].astype(object).tolist() == ['12345'] * 60 + ['02139-4307'] * 60
+    parse_cache.store('streamed', df)
+    assert parse_cache.load('streamed')['ZIP'].astype(object).tolist() == df['ZIP'].astype(object).tolist()
+
+
+def test_public_api_fallback_reads_the_same_frame(export, monkeypatch):
+    frame = generate_export(150, seed=8)
+    # A column outside the schema, so the fast path skips cells
+    frame['Notes'] = 'n/a'
+    data = export(frame)
+    expected = read_workbook(data)
+
+    monkeypatch.setattr(ingest, 'WorkSheetParser', None)
+    pd.testing.assert_frame_equal(read_workbook(data), expected)
+    with pytest.raises(SchemaError):
+        read_workbook(export(frame.drop(columns='Amount')))
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import analytics
+from utils.donor_ids import DonorDictionary
+from utils.ingest import load_uploads
+from utils.partials import file_partials, merge
+from utils.schema import concat_frames
+from utils.summary import build_donor_summary
+
+
+@pytest.fixture
+def two_files(export):
+    dictionary = DonorDictionary()
+    frames = []
+    for _, _, df, error in load_uploads([('a.xlsx', export(400, seed=1)), ('b.xlsx', export(300, seed=2))]):
+        assert error is None
+        df['Donor ID'] = dictionary.encode(df)
+        frames.append(df)
+    return frames, dictionary
+
+
+def test_merged_partials_match_the_combined_frame(two_files):
+    frames, dictionary = two_files
+    merged = merge([file_partials(df) for df in frames], dictionary)
+    combined = concat_frames(frames)
+
+    stats = merged['overview_stats'].iloc[0]
+    expected = analytics.overview_stats('partials-combined', combined)
+    assert stats['total_donations'] == pytest.approx(expected['total_donations'])
+    for key in ('unique_donors', 'repeat_donors', 'org_donors'):
+        assert stats[key] == expected[key]
+
+    monthly = analytics.monthly_totals('partials-combined', combined)
+    np.testing.assert_allclose(merged['monthly_totals']['Donation Amount'], monthly['Donation Amount'])
+    assert (merged['monthly_totals']['Month'].to_numpy() == monthly['Month'].to_numpy()).all()
+
+    campaigns = analytics.campaign_summary('partials-combined', combined)
+    pd.testing.assert_frame_equal(
+        merged['campaign_summary'].set_index('Campaign Title').sort_index()[['Total Raised', 'Donation Count']],
+        campaigns.set_index('Campaign Title').sort_index()[['Total Raised', 'Donation Count']],
+        check_dtype=False, check_index_type=False, check_categorical=False,
+    )
+
+    zips = merged['zip_summary'].set_index('ZIP')['Donation Amount']
+    expected_zips = analytics.zip_summary('partials-combined', combined)
+    pd.testing.assert_series_equal(zips.sort_index(), expected_zips.sort_index(), check_index_type=False,
+                                   check_categorical=False, check_names=False)
+
+    pd.testing.assert_frame_equal(merged['donor_summary'], build_donor_summary(combined, dictionary),
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_merging_only_the_remaining_file_gives_its_own_totals(two_files):
+    frames, dictionary = two_files
+    partials = [file_partials(df) for df in frames]
+    remaining = merge(partials[1:], dictionary)
+    stats = remaining['overview_stats'].iloc[0]
+    assert stats['total_donations'] == pytest.approx(frames[1]['Donation Amount'].sum())
+    pd.testing.assert_frame_equal(remaining['donor_summary'], build_donor_summary(frames[1], dictionary),
+                                  check_dtype=False, check_categorical=False)
@@ -0,0 +1,52 @@
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from utils import profiling
+
+HOME = str(Path(__file__).resolve().parents[1] / 'Home.py')
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    profiling._tracing_sessions.clear()
+    yield
+    profiling._tracing_sessions.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _profile(at, on):
+    at.sidebar.toggle(key='profiling_toggle').set_value(on).run()
+    assert not at.exception, [e.value for e in at.exception]
+
+
+def test_toggle_starts_and_stops_tracing():
+    at = AppTest.from_file(HOME, default_timeout=120).run()
+    assert not tracemalloc.is_tracing()
+    _profile(at, True)
+    assert tracemalloc.is_tracing()
+    _profile(at, False)
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_runs_until_the_last_session_stops_profiling(monkeypatch):
+    def as_session(session_id, on):
+        monkeypatch.setattr(profiling, 'get_script_run_ctx', lambda: SimpleNamespace(session_id=session_id))
+        profiling._update_tracing(on)
+
+    as_session('first', True)
+    as_session('second', True)
+    as_session('first', False)
+    assert tracemalloc.is_tracing()
+    as_session('second', False)
+    assert not tracemalloc.is_tracing()
+
+
+def test_sections_record_without_tracing():
+    with profiling.section('Outside a session') as prof:
+        pass
+    assert prof.peak_bytes == 0 and prof.seconds >= 0
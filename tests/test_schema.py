@@ -0,0 +1,25 @@
+from utils.ingest import load_uploads
+from utils.schema import concat_frames
+
+
+def test_cached_and_fresh_frames_concatenate(export):
+    a, b = export(300, seed=1), export(300, seed=2)
+    ((_, _, fresh_a, error),) = load_uploads([('a.xlsx', a)])
+    assert error is None
+    # a now comes from the parse cache, b is parsed
+    (_, _, cached_a, error_a), (_, _, fresh_b, error_b) = load_uploads([('a.xlsx', a), ('b.xlsx', b)])
+    assert error_a is None and error_b is None
+
+    combined = concat_frames([cached_a, fresh_b])
+    assert len(combined) == len(fresh_a) + len(fresh_b)
+    assert combined['ZIP'].astype(object).tolist() == \
+        fresh_a['ZIP'].astype(object).tolist() + fresh_b['ZIP'].astype(object).tolist()
+
+
+def test_string_categories_of_either_kind_concatenate(export):
+    ((_, _, df, _),) = load_uploads([('a.xlsx', export(100))])
+    legacy = df.copy()
+    legacy['ZIP'] = legacy['ZIP'].cat.rename_categories(legacy['ZIP'].cat.categories.astype('string'))
+    combined = concat_frames([df, legacy])
+    assert combined['ZIP'].cat.categories.dtype == df['ZIP'].cat.categories.dtype
+    assert combined['ZIP'].isna().sum() == 2 * df['ZIP'].isna().sum()
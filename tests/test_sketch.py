@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import analytics, cohort, sketch
+from utils.donor_ids import DonorDictionary
+from utils.ingest import load_uploads
+from utils.schema import NO_DATE
+
+
+@pytest.mark.parametrize('n', [10, 1_000, 200_000])
+def test_estimate_is_within_a_few_standard_errors(n):
+    ids = np.random.default_rng(n).permutation(10 * n)[:n]
+    estimate, error = sketch.count(sketch.sketch_frame(np.repeat(ids, 3), np.zeros(3 * n, dtype=np.int64), 'Month'))
+    assert error == pytest.approx(estimate * sketch.RELATIVE_ERROR)
+    assert abs(estimate - n) <= 4 * sketch.RELATIVE_ERROR * n + 1
+
+
+def test_merged_sketches_equal_the_sketch_of_the_union():
+    rng = np.random.default_rng(0)
+    ids = rng.integers(0, 50_000, 60_000)
+    months = rng.integers(0, 12, 60_000)
+    # The two halves overlap in rows 25,000 to 35,000
+    halves = [sketch.sketch_frame(ids[part], months[part], 'Month') for part in (slice(35_000), slice(25_000, None))]
+    merged = sketch.merge(halves, 'Month')
+    whole = sketch.sketch_frame(ids, months, 'Month')
+    pd.testing.assert_frame_equal(merged, whole, check_dtype=False)
+
+
+def test_month_range_of_a_sketch_equals_a_rescan():
+    rng = np.random.default_rng(1)
+    ids = rng.integers(0, 5_000, 20_000)
+    months = rng.integers(0, 24, 20_000)
+    frame = sketch.sketch_frame(ids, months, 'Month')
+    in_range = (months >= 6) & (months < 18)
+    sliced = frame[frame['Month'].between(6, 17)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(sliced, sketch.sketch_frame(ids[in_range], months[in_range], 'Month'))
+
+
+def test_approximate_retention_is_within_its_margins():
+    rng = np.random.default_rng(2)
+    donors = 20_000
+    # Each donor starts in some quarter and gives in a random subset of the later ones
+    first = rng.integers(0, 8, donors)
+    ids, quarters = [], []
+    for q in range(8):
+        active = (first == q) | ((first < q) & (rng.random(donors) < 0.4))
+        ids.append(np.flatnonzero(active))
+        quarters.append(np.full(active.sum(), q))
+    ids, quarters = np.concatenate(ids), np.concatenate(quarters)
+
+    _, exact = cohort.retention_matrix(ids, quarters)
+    _, registers = sketch.dense(sketch.sketch_frame(ids, quarters, 'Quarter'), 'Quarter', np.arange(8))
+    counts, margins = cohort.approximate_retention_matrix(registers)
+
+    assert counts.shape == exact.shape
+    # Row c is the cohort starting in quarter c, so it has 8 - c quarters
+    assert (counts[np.add.outer(np.arange(8), np.arange(8)) >= 8] == 0).all()
+    assert (np.abs(counts - exact) <= 4 * margins + 1).all()
+    # The cohort sizes (first column) are the most precise cells
+    assert np.abs(counts[:, 0] - exact[:, 0]).max() <= 4 * sketch.RELATIVE_ERROR * donors
+
+
+def test_approximate_cohort_table_matches_the_exact_one(export):
+    (_, _, df, _), = load_uploads([('a.xlsx', export(3_000, seed=9))])
+    df['Donor ID'] = DonorDictionary().encode(df)
+
+    exact = analytics.cohort_table('sketch-exact', df, 'retention')
+    approx = analytics.approximate_cohort_retention('sketch-approx', analytics.donor_sketch('sketch-approx', df))
+    cells = exact.merge(approx, on=['Cohort Label', 'Quarter Index'], how='outer', suffixes=('', ' ≈'))
+    # Either table leaves out cells it puts at zero donors; those get their cohort's widest margin
+    widest = cells.groupby('Cohort Label')['Margin (± pts)'].transform('max')
+    cells['Margin (± pts)'] = cells['Margin (± pts)'].fillna(widest)
+    cells = cells.fillna({'Retention Rate (%)': 0.0, 'Retention Rate (%) ≈': 0.0})
+    gap = (cells['Retention Rate (%) ≈'] - cells['Retention Rate (%)']).abs()
+    assert (gap <= 4 * cells['Margin (± pts)'] + 1).all()
+
+
+def test_approximate_cohort_table_of_undated_gifts_is_empty():
+    undated = sketch.sketch_frame(np.arange(50), np.full(50, NO_DATE), 'Donation Month')
+    table = analytics.approximate_cohort_retention('sketch-undated', undated)
+    assert table.empty
+    assert list(table.columns) == ['Cohort Label', 'Quarter Index', 'Retention Rate (%)', 'Margin (± pts)']
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic import generate_export
+from utils import snapshot
+
+HOME = str(Path(__file__).resolve().parents[1] / 'Home.py')
+
+
+def _session(token=None):
+    at = AppTest.from_file(HOME, default_timeout=120)
+    if token is not None:
+        at.query_params[snapshot.TOKEN_PARAM] = token
+    return at.run()
+
+
+def _uploaded(at, uploads):
+    at.sidebar.file_uploader[0].set_value(uploads).run()
+    assert not at.exception, [e.value for e in at.exception]
+    snapshot._wait(at.session_state['snapshot_token'])
+    return at.session_state['snapshot_token']
+
+
+def test_snapshot_restores_only_for_its_token(upload):
+    at = _session()
+    token = _uploaded(at, [upload(generate_export(200, seed=5), 'a.xlsx')])
+    assert at.query_params[snapshot.TOKEN_PARAM] == token
+
+    stranger = _session()
+    assert stranger.session_state['uploaded_file_names'] == []
+    assert not stranger.session_state['donor_data'].shape[0]
+
+    refreshed = _session(token)
+    assert refreshed.session_state['restored_snapshot']
+    assert refreshed.session_state['uploaded_file_names'] == ['a.xlsx']
+    assert {m.label: m.value for m in refreshed.metric} == {m.label: m.value for m in at.metric}
+
+
+def test_clearing_keeps_other_tokens_snapshots(upload):
+    mine = _uploaded(_session(), [upload(generate_export(150, seed=6), 'mine.xlsx')])
+    theirs = _uploaded(_session(), [upload(generate_export(120, seed=7), 'theirs.xlsx')])
+
+    restored = _session(mine)
+    restored.sidebar.button(key='snapshot_clear').click().run()
+    assert 'restored_snapshot' not in restored.session_state
+
+    assert _session(mine).session_state['uploaded_file_names'] == []
+    assert _session(theirs).session_state['uploaded_file_names'] == ['theirs.xlsx']
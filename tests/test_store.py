@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_export
+from utils import store
+from utils.donor_ids import DonorDictionary
+from utils.filters import DataFilter
+from utils.ingest import load_uploads
+from utils.summary import build_donor_summary
+
+pytest.importorskip('duckdb')
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    """A store of the test's own."""
+    monkeypatch.setattr(store, 'DB_PATH', str(tmp_path / 'donors.duckdb'))
+    store._connection.clear()
+    yield
+    store._connection().close()
+    store._connection.clear()
+
+
+def _stored(export, frame, name):
+    dictionary = DonorDictionary()
+    (_, file_hash, df, error), = load_uploads([(name, export(frame))])
+    assert error is None
+    df['Donor ID'] = dictionary.encode(df)
+    store.add_file(file_hash, df)
+    return store.Selection([file_hash], dictionary), df
+
+
+def test_file_without_rows_is_empty(export):
+    selection, df = _stored(export, generate_export(10, seed=11).iloc[:0], 'header_only.xlsx')
+    assert df.empty
+    assert selection.empty and len(selection) == 0
+
+
+def test_filter_that_selects_nothing_is_empty(export):
+    selection, df = _stored(export, generate_export(200, seed=12), 'a.xlsx')
+    assert not selection.empty and len(selection) == len(df)
+    nothing = selection.filtered(DataFilter(campaigns=('No such campaign',)))
+    assert nothing.empty and len(nothing) == 0
+
+
+def test_donor_summary_matches_memory_mode(export):
+    selection, df = _stored(export, generate_export(500, seed=13), 'a.xlsx')
+    pd.testing.assert_frame_equal(selection.donor_summary(), build_donor_summary(df, selection.dictionary),
+                                  check_dtype=False, check_categorical=False, check_index_type=False)
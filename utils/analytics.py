@@ -0,0 +1,235 @@
+"""Dataset-level aggregations memoized on the dataset version.
+
+Each function takes the dataset version as its first argument and the frame as
+an underscore argument, which st.cache_data does not hash. Widget reruns hit the
+cache and only redo the cheap, widget-specific step in the page.
+
+With the DuckDB store enabled the "frame" is a store.Selection: the plain
+aggregations run as SQL in the store, and the row-level ones fetch only the
+columns they need.
+
+When a report built by scripts/build_report.py matches the loaded exports,
+the order-independent results are read from its artifacts instead.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import artifacts, charts, churn, cohort, geocode, sketch, store
+from utils.donor_ids import UNKNOWN_DONOR
+from utils.schema import NO_DATE, month_starts
+
+CACHE_ENTRIES = 32
+
+
+def _rows(data, columns):
+    """The frame itself, or just ``columns`` fetched from a store selection."""
+    return data.frame(columns) if isinstance(data, store.Selection) else data
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def monthly_totals(version, _df):
+    """Monthly donation totals with a running cumulative total."""
+    precomputed = artifacts.lookup(version, 'monthly_totals')
+    if precomputed is not None:
+        return precomputed
+    if isinstance(_df, store.Selection):
+        return _df.monthly_totals()
+    df = _rows(_df, ['Donation Month', 'Donation Amount'])
+    dated = df[df['Donation Month'] != NO_DATE]
+    monthly = dated.groupby('Donation Month')['Donation Amount'].sum().reset_index()
+    monthly.insert(0, 'Month', month_starts(monthly.pop('Donation Month')))
+    monthly['Cumulative Total'] = monthly['Donation Amount'].cumsum()
+    return monthly
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def overview_stats(version, _df):
+    """Headline KPIs: total raised, unique donors, repeat donors and organization gifts."""
+    precomputed = artifacts.lookup(version, 'overview_stats')
+    if precomputed is not None:
+        row = precomputed.iloc[0]
+        return {'total_donations': float(row['total_donations']),
+                **{k: int(row[k]) for k in ('unique_donors', 'repeat_donors', 'org_donors')}}
+    if isinstance(_df, store.Selection):
+        return _df.overview_stats()
+    donor_ids = _df['Donor ID'].to_numpy()
+    gifts_per_donor = np.bincount(donor_ids[donor_ids != UNKNOWN_DONOR])
+    return {
+        'total_donations': float(_df['Donation Amount'].sum()),
+        'unique_donors': int((gifts_per_donor > 0).sum()),
+        'repeat_donors': int((gifts_per_donor > 1).sum()),
+        'org_donors': int((_df['Donor Type'] == 'Organization').sum()),
+    }
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def campaign_summary(version, _df, dated_only=False):
+    """Total, count and average gift per campaign."""
+    precomputed = artifacts.lookup(version, 'campaign_summary_dated' if dated_only else 'campaign_summary')
+    if precomputed is not None:
+        return precomputed
+    if isinstance(_df, store.Selection):
+        return _df.campaign_summary(dated_only)
+    df = _df.dropna(subset=['Date']) if dated_only else _df
+    summary = df.groupby('Campaign Title', observed=True)['Donation Amount'].agg(['sum', 'count', 'mean']).reset_index()
+    summary = summary.rename(columns={'sum': 'Total Raised', 'count': 'Donation Count', 'mean': 'Average Gift'})
+    summary['Total Raised'] = pd.to_numeric(summary['Total Raised'], errors='coerce')
+    return summary.dropna(subset=['Total Raised'])
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def zip_summary(version, _df):
+    """Total donations per ZIP, largest first."""
+    precomputed = artifacts.lookup(version, 'zip_summary')
+    if precomputed is not None:
+        return precomputed.set_index('ZIP')['Donation Amount']
+    if isinstance(_df, store.Selection):
+        return _df.zip_summary()
+    return _df.groupby('ZIP', observed=True)['Donation Amount'].sum().sort_values(ascending=False)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def amount_histogram(version, _df, max_amount, step):
+    """Pre-binned counts of dated donation amounts up to ``max_amount``."""
+    amounts = _rows(_df, ['Date', 'Donation Amount']).dropna(subset=['Date', 'Donation Amount'])['Donation Amount']
+    return charts.histogram(amounts[amounts <= max_amount], step)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def zip5_totals(version, _df):
+    """Total donations per five-digit ZIP, largest first."""
+    totals = zip_summary(version, _df)
+    totals = totals.groupby(geocode.normalize_zip5(totals.index)).sum().sort_values(ascending=False)
+    return totals.rename_axis('ZIP').reset_index()
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def zip_geo_totals(version, _df):
+    """ZIP totals with centroid coordinates; None when no centroid table is installed."""
+    return geocode.attach_coordinates(zip5_totals(version, _df))
+
+
+COHORT_KINDS = ('retention', 'monetary')
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def cohort_table(version, _df, kind):
+    """Heatmap frame for cohort retention % (``kind='retention'``) or monetary value ('monetary').
+
+    The two are cached separately so a page only pays for the heatmap it shows.
+    """
+    precomputed = artifacts.lookup(version, f'cohort_{kind}')
+    if precomputed is not None:
+        return precomputed
+    df = _rows(_df, ['Donation Quarter', 'Donor ID'] + (['Donation Amount'] if kind == 'monetary' else []))
+    dated = df[(df['Donation Quarter'] != NO_DATE) & (df['Donor ID'] != UNKNOWN_DONOR)]
+    donors, quarters = dated['Donor ID'].to_numpy(), dated['Donation Quarter'].to_numpy()
+    if kind == 'retention':
+        if dated.empty:
+            return cohort.retention_frame(0, np.zeros((0, 0), dtype=np.int64))
+        return cohort.retention_frame(*cohort.retention_matrix(donors, quarters))
+    if kind == 'monetary':
+        if dated.empty:
+            return cohort.monetary_frame(0, np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0)))
+        return cohort.monetary_frame(*cohort.monetary_matrix(donors, quarters, dated['Donation Amount'].to_numpy()))
+    raise ValueError(f"Unknown cohort table {kind!r}; expected one of {COHORT_KINDS}")
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def donor_sketch(version, _df):
+    """Distinct-donor sketch of the known donors per Donation Month (see utils/sketch.py)."""
+    precomputed = artifacts.lookup(version, 'donor_sketch')
+    if precomputed is not None:
+        return precomputed
+    df = _rows(_df, ['Donation Month', 'Donor ID'])
+    known = df[df['Donor ID'] != UNKNOWN_DONOR]
+    return sketch.sketch_frame(known['Donor ID'].to_numpy(), known['Donation Month'].to_numpy(), 'Donation Month')
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def approximate_cohort_retention(version, _sketch):
+    """cohort_table(kind='retention') estimated from a donor_sketch(), with each cell's margin.
+
+    Takes time in the number of quarters, however many rows the sketch covers.
+    """
+    dated = _sketch[_sketch['Donation Month'] != NO_DATE]
+    if dated.empty:
+        return cohort.retention_frame(0, np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0)))
+    quarters = dated['Donation Month'].to_numpy() // 3
+    first_quarter = int(quarters.min())
+    _, registers = sketch.dense(
+        pd.DataFrame({'Quarter': quarters - first_quarter, 'Register': dated['Register'].to_numpy(),
+                      'Rank': dated['Rank'].to_numpy()}),
+        'Quarter', np.arange(int(quarters.max()) - first_quarter + 1),
+    )
+    return cohort.retention_frame(first_quarter, *cohort.approximate_retention_matrix(registers))
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def churn_table(version, _df):
+    """Quarterly churn statistics for known donors."""
+    precomputed = artifacts.lookup(version, 'churn')
+    if precomputed is not None:
+        return precomputed
+    df = _rows(_df, ['Donation Quarter', 'Donor ID'])
+    dated = df[(df['Donation Quarter'] != NO_DATE) & (df['Donor ID'] != UNKNOWN_DONOR)]
+    return churn.quarterly_churn(dated['Donor ID'].to_numpy(), dated['Donation Quarter'].to_numpy())
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def donor_type_counts(version, _df):
+    """Number of gifts with an amount per Donor Type, most common first."""
+    if isinstance(_df, store.Selection):
+        return _df.donor_type_counts()
+    return _df.dropna(subset=['Donation Amount'])['Donor Type'].value_counts().reset_index()
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def retention_counts(version, _donor_summary):
+    """Number of new vs. returning donors."""
+    precomputed = artifacts.lookup(version, 'retention_counts')
+    if precomputed is not None:
+        return precomputed
+    retention_data = _donor_summary['Retention Status'].value_counts().reset_index()
+    retention_data.columns = ["Retention Status", "Count"]
+    return retention_data
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def pareto_table(version, _donor_summary):
+    """Donors ranked by total given, with the cumulative share of all donations."""
+    pareto_df = _donor_summary[['Donor', 'Total Amount']].rename(columns={'Total Amount': 'Donation Amount'})
+    pareto_df = pareto_df.sort_values('Donation Amount', ascending=False).reset_index()
+    pareto_df['Cumulative %'] = pareto_df['Donation Amount'].cumsum() / pareto_df['Donation Amount'].sum() * 100
+    pareto_df['Donor Rank'] = pareto_df.index + 1
+    return pareto_df
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def yoy_cube(version, _df):
+    """Campaign x year donation totals, with the year stripped from campaign names.
+
+    Rows are the cleaned campaign names in sorted order and columns every year
+    with a dated gift; combinations without gifts are 0. Picking a campaign in
+    the page is then a single row lookup.
+    """
+    df = _rows(_df, ['Donation Year', 'Donation Amount', 'Campaign Clean'])
+    campaigns = pd.Categorical(df['Campaign Clean'])
+
+    codes = campaigns.codes
+    keep = (codes >= 0) & (df['Donation Year'].to_numpy() != NO_DATE) & df['Donation Amount'].notna().to_numpy()
+    codes = codes[keep].astype(np.int64)
+    years = df['Donation Year'].to_numpy()[keep]
+    all_years = cohort.sorted_unique(years)
+
+    n_campaigns, n_years = len(campaigns.categories), len(all_years)
+    cells = codes * n_years + np.searchsorted(all_years, years)
+    totals = np.bincount(cells, weights=df['Donation Amount'].to_numpy()[keep], minlength=n_campaigns * n_years)
+    seen = np.bincount(codes, minlength=n_campaigns) > 0
+    cube = pd.DataFrame(
+        totals.reshape(n_campaigns, n_years)[seen],
+        index=pd.Index(campaigns.categories[seen], name='Campaign Clean'),
+        columns=pd.Index(all_years, name='Donation Year'),
+    )
+    return cube.sort_index()
@@ -0,0 +1,92 @@
+"""Precomputed analytics artifacts written by scripts/build_report.py.
+
+A report lives in ``<CVC_REPORT_DIR>/<content key>/``, one Parquet file per
+artifact plus manifest.json and report.html. The content key depends on the
+set of exports, the ingest schema and FORMAT, so the dashboard finds the
+report again when the same files are uploaded in any order, but not one built
+by code that parsed or aggregated them differently. Analytics whose results
+don't depend on upload order are then served from the report instead of
+being recomputed.
+
+The same registry holds the merged per-file partials (utils/partials.py), so
+the overview results are served from them when no report exists.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from utils.schema import INGEST_SCHEMA_KEY
+
+REPORT_DIR = Path(os.environ.get('CVC_REPORT_DIR') or Path(__file__).resolve().parent.parent / 'reports')
+
+# Bumped when ingest or the analytics change what a report's artifacts hold
+FORMAT = 1
+
+# Registered reports kept in memory, most recently used last
+MAX_REGISTERED = 32
+
+
+def content_key(file_hashes):
+    """Order-independent key for a set of exports, from their content hashes, the ingest schema and FORMAT."""
+    parts = [INGEST_SCHEMA_KEY, str(FORMAT), *sorted(file_hashes)]
+    return hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()
+
+
+def write(key, frames, report_dir=REPORT_DIR):
+    """Write ``{name: frame}`` as Parquet files plus a manifest and return the report directory."""
+    out = Path(report_dir) / key
+    out.mkdir(parents=True, exist_ok=True)
+    for name, frame in frames.items():
+        frame.to_parquet(out / f"{name}.parquet")
+    manifest = {
+        'content_key': key,
+        'format': FORMAT,
+        'ingest_schema': INGEST_SCHEMA_KEY,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'artifacts': sorted(frames),
+    }
+    (out / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+    return out
+
+
+def read(key, report_dir=REPORT_DIR):
+    """``{name: frame}`` for a written report, or None if there is none or it was built by other code."""
+    folder = Path(report_dir) / key
+    try:
+        manifest = json.loads((folder / 'manifest.json').read_text())
+        if manifest.get('format') != FORMAT or manifest.get('ingest_schema') != INGEST_SCHEMA_KEY:
+            return None
+        return {name: pd.read_parquet(folder / f"{name}.parquet") for name in manifest['artifacts']}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def _registry():
+    return OrderedDict()
+
+
+def register(version, frames):
+    """Make a report's artifacts or merged partials available to the analytics for one dataset version."""
+    registry = _registry()
+    registry[version] = frames
+    registry.move_to_end(version)
+    while len(registry) > MAX_REGISTERED:
+        registry.popitem(last=False)
+
+
+def registered(version):
+    """``{name: frame}`` registered for ``version``; empty if there is none."""
+    return dict(_registry().get(version) or {})
+
+
+def lookup(version, name):
+    """The precomputed artifact ``name`` for ``version``, or None."""
+    frames = _registry().get(version)
+    return None if frames is None else frames.get(name)
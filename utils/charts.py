@@ -0,0 +1,47 @@
+"""Pre-aggregated, size-capped data for Altair charts.
+
+Every frame handed to alt.Chart goes through one of these helpers so the
+embedded Vega-Lite spec stays small no matter how many donations are loaded.
+"""
+import numpy as np
+import pandas as pd
+
+# Matches Altair's default max_rows
+MAX_CHART_ROWS = 5000
+
+
+def histogram(values, step):
+    """Counts per ``step``-wide bin, one row per non-empty bin (Bin Start, Bin End, Frequency)."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return pd.DataFrame({'Bin Start': [], 'Bin End': [], 'Frequency': []})
+    first = np.floor(values.min() / step)
+    counts = np.bincount((np.floor(values / step) - first).astype(np.int64))
+    starts = (first + np.arange(len(counts))) * step
+    bins = pd.DataFrame({'Bin Start': starts, 'Bin End': starts + step, 'Frequency': counts})
+    return bins[bins['Frequency'] > 0].reset_index(drop=True)
+
+
+def downsample(frame, max_rows=MAX_CHART_ROWS):
+    """Evenly spaced rows of an ordered series, always keeping the first and last row."""
+    if len(frame) <= max_rows:
+        return frame
+    positions = np.unique(np.linspace(0, len(frame) - 1, max_rows).round().astype(np.int64))
+    return frame.iloc[positions]
+
+
+def top_rows(frame, column, max_rows=MAX_CHART_ROWS):
+    """The ``max_rows`` rows with the largest ``column`` values."""
+    if len(frame) <= max_rows:
+        return frame
+    return frame.nlargest(max_rows, column)
+
+
+def latest_groups(frame, column, max_rows=MAX_CHART_ROWS):
+    """Keep the most recent (highest-sorting) groups of ``column`` that fit in ``max_rows``."""
+    if len(frame) <= max_rows:
+        return frame
+    sizes = frame.groupby(column, sort=True).size()
+    fits = sizes[::-1].cumsum() <= max_rows
+    return frame[frame[column].isin(fits[fits].index)]
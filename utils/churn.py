@@ -0,0 +1,36 @@
+"""Quarter-over-quarter donor churn from sparse (donor, quarter) activity."""
+import numpy as np
+import pandas as pd
+
+from utils.cohort import quarter_labels, sorted_unique
+
+
+def quarterly_churn(donor_ids, quarters):
+    """Churned / retained donors for each observed quarter and the next observed one.
+
+    Activity is kept as the sorted, de-duplicated array of (donor, quarter)
+    pairs rather than a dense donor x quarter table. A pair is retained when
+    the next pair belongs to the same donor in the next observed quarter.
+    """
+    observed = sorted_unique(np.asarray(quarters, dtype=np.int64))
+    k = len(observed)
+    rank = np.searchsorted(observed, quarters)
+
+    pairs = sorted_unique(np.asarray(donor_ids, dtype=np.int64) * k + rank)
+    pair_donor = pairs // k
+    pair_rank = pairs % k
+
+    active = np.bincount(pair_rank, minlength=k)
+    returns = (pair_donor[1:] == pair_donor[:-1]) & (pair_rank[1:] == pair_rank[:-1] + 1)
+    retained = np.bincount(pair_rank[:-1][returns], minlength=k)
+    churned = active - retained
+
+    index = pd.PeriodIndex(quarter_labels(observed[:-1]), freq='Q', name='Quarter')
+    churn_df = pd.DataFrame({
+        'Quarter': index,
+        'Churned Donors': churned[:-1],
+        'Retained Donors': retained[:-1]
+    }, index=index)
+    churn_df['Total Prev Active'] = churn_df['Churned Donors'] + churn_df['Retained Donors']
+    churn_df['Churn Rate (%)'] = churn_df['Churned Donors'] / churn_df['Total Prev Active'] * 100
+    return churn_df
@@ -0,0 +1,151 @@
+"""Cohort retention and monetary matrices on integer quarter codes."""
+import numpy as np
+import pandas as pd
+
+from utils import sketch
+
+
+def quarter_labels(codes):
+    """'2023Q1'-style labels for absolute quarter codes."""
+    codes = np.asarray(codes)
+    return pd.Index([f"{c // 4}Q{c % 4 + 1}" for c in codes])
+
+
+def sorted_unique(values):
+    """np.unique via a plain sort, which is much faster than its hash path on large int arrays."""
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    return values[np.r_[True, values[1:] != values[:-1]]]
+
+
+def _relative_quarters(quarters):
+    """``(first_quarter, q, n)``: codes relative to the earliest quarter and the matrix size."""
+    first_quarter = int(quarters.min())
+    q = np.asarray(quarters, dtype=np.int64) - first_quarter
+    return first_quarter, q, int(q.max()) + 1
+
+
+def retention_matrix(donor_ids, quarters):
+    """Distinct donors per cohort x quarters since their first gift.
+
+    ``donor_ids`` must be non-negative and ``quarters`` absolute quarter codes.
+    Returns ``(first_quarter, counts)``: the absolute code of the earliest
+    quarter and the N x N counts, where row i is the cohort starting
+    ``first_quarter + i``.
+    """
+    donor_ids = np.asarray(donor_ids, dtype=np.int64)
+    first_quarter, q, n = _relative_quarters(quarters)
+
+    # Deduplicate (donor, quarter) pairs once; sorted by donor, then quarter
+    pairs = sorted_unique(donor_ids * n + q)
+    pair_donor = pairs // n
+    pair_quarter = pairs % n
+    starts = np.flatnonzero(np.r_[True, pair_donor[1:] != pair_donor[:-1]])
+    cohort_start = pair_quarter[starts]
+    pair_cohort = np.repeat(cohort_start, np.diff(np.r_[starts, len(pairs)]))
+
+    counts = np.bincount(pair_cohort * n + (pair_quarter - pair_cohort), minlength=n * n).reshape(n, n)
+    return first_quarter, counts
+
+
+def _nested_error(added, base):
+    """Standard error of est(S | T) - est(S) for ``added`` = |T minus S| and ``base`` = |S|.
+
+    Most registers are shared, so this grows like sqrt(added * base) rather
+    than with the sets themselves; simulations with sketch.estimate() stay
+    within it.
+    """
+    added = np.maximum(added, 0)
+    return sketch.RELATIVE_ERROR * np.sqrt(added * (added + 2 * np.maximum(base, 0)))
+
+
+def approximate_retention_matrix(registers):
+    """retention_matrix() estimated from donor sketches, with the standard error of every cell.
+
+    ``registers`` holds the sketch of the donors active in each of n
+    consecutive quarters (see utils/sketch.py). A sketch can't be split by
+    cohort, so each cell is a difference of unions: with P(c) the donors
+    active before quarter c and A the quarter's donors, the cohort's donors
+    active in quarter q are (|P(c+1)| - |P(c)|) - (|A(q) | P(c+1)| - |A(q) | P(c)|).
+    Cells of late cohorts, which have many earlier donors, are the least
+    precise. The errors treat the two differences as independent, which
+    overstates them somewhat. Returns ``(counts, errors)`` as N x N arrays
+    laid out like retention_matrix().
+    """
+    n = len(registers)
+    # before[c]: registers of every quarter before c; before[n] covers all of them
+    before = np.zeros((n + 1, sketch.REGISTERS), dtype=np.uint8)
+    np.maximum.accumulate(registers, axis=0, out=before[1:])
+    prior = sketch.estimate(before)
+    unions = np.stack([sketch.estimate(np.maximum(registers, before[c])) for c in range(n + 1)])
+
+    c, q = np.triu_indices(n)
+    joined = prior[c + 1] - prior[c]
+    missed = unions[c + 1, q] - unions[c, q]
+    errors = np.hypot(_nested_error(joined, prior[c]), _nested_error(missed, unions[c, q]))
+
+    sizes = np.maximum(np.rint(prior[1:] - prior[:-1]), 0)
+    counts = np.zeros((n, n), dtype=np.int64)
+    margins = np.zeros((n, n))
+    counts[c, q - c] = np.clip(np.rint(joined - missed), 0, sizes[c])
+    margins[c, q - c] = errors
+    return counts, margins
+
+
+def monetary_matrix(donor_ids, quarters, amounts):
+    """Gift counts and donation sums per cohort x quarters since the donor's first gift.
+
+    Needs only each donor's first quarter, not the distinct (donor, quarter)
+    pairs, so it skips the sort retention_matrix() pays for. Returns
+    ``(first_quarter, gifts, monetary)`` laid out like retention_matrix().
+    """
+    donor_ids = np.asarray(donor_ids, dtype=np.int64)
+    first_quarter, q, n = _relative_quarters(quarters)
+
+    cohort_of = np.full(int(donor_ids.max()) + 1, n, dtype=np.int64)
+    np.minimum.at(cohort_of, donor_ids, q)
+    row_cohort = cohort_of[donor_ids]
+    cells = row_cohort * n + (q - row_cohort)
+    gifts = np.bincount(cells, minlength=n * n).reshape(n, n)
+    monetary = np.bincount(
+        cells, weights=np.nan_to_num(np.asarray(amounts, dtype=float)), minlength=n * n
+    ).reshape(n, n)
+    return first_quarter, gifts, monetary
+
+
+def _cells(first_quarter, occupied):
+    """Labels, cohort rows and quarter indexes of the occupied cells, cohort by cohort."""
+    if not occupied.shape[0]:
+        none = np.zeros(0, dtype=np.int64)
+        return quarter_labels(none), none, none
+    cohort_rows = np.flatnonzero(occupied[:, 0] > 0)
+    row_idx, quarter_idx = np.nonzero(occupied[cohort_rows] > 0)
+    cohorts = cohort_rows[row_idx]
+    return quarter_labels(first_quarter + cohorts), cohorts, quarter_idx
+
+
+def retention_frame(first_quarter, counts, errors=None):
+    """Long-format retention % frame for the heatmap; empty cells are omitted.
+
+    With the ``errors`` of approximate_retention_matrix(), each cell also gets
+    its margin in percentage points of the cohort.
+    """
+    labels, cohorts, quarter_idx = _cells(first_quarter, counts)
+    # Each cell's cohort size, its quarter 0; an array index so 0 x 0 counts work too
+    sizes = counts[cohorts, np.zeros_like(quarter_idx)]
+    frame = pd.DataFrame({
+        'Cohort Label': labels, 'Quarter Index': quarter_idx,
+        'Retention Rate (%)': counts[cohorts, quarter_idx] / sizes * 100,
+    })
+    if errors is not None:
+        frame['Margin (± pts)'] = errors[cohorts, quarter_idx] / sizes * 100
+    return frame
+
+
+def monetary_frame(first_quarter, gifts, monetary):
+    """Long-format monetary frame for the heatmap; cells without gifts are omitted."""
+    labels, cohorts, quarter_idx = _cells(first_quarter, gifts)
+    return pd.DataFrame({
+        'Cohort Label': labels, 'Quarter Index': quarter_idx, 'Monetary Value': monetary[cohorts, quarter_idx]
+    })
@@ -0,0 +1,96 @@
+"""Duplicate transactions across overlapping exports.
+
+GiveButter exports for overlapping date ranges repeat the same gifts. Every
+row gets a 64-bit transaction key: a hash of its Transaction ID or, for rows
+without one, a fingerprint of the columns that describe the gift. A row is a
+duplicate if a file loaded earlier already has its key. Repeats within one
+export are kept, since identical rows there can be separate gifts.
+"""
+import numpy as np
+import pandas as pd
+
+# Columns hashed into the fingerprint of a row without a Transaction ID
+FINGERPRINT_COLUMNS = [
+    'Date', 'Donation Amount', 'Email', 'First Name', 'Last Name', 'Business/Organization Name', 'Campaign Title',
+]
+
+# Different hash keys keep ID hashes and fingerprints apart
+_ID_HASH_KEY = 'cvc-transaction0'
+_FINGERPRINT_HASH_KEY = 'cvc-fingerprint0'
+
+
+def _hash(frame, hash_key):
+    return pd.util.hash_pandas_object(frame, index=False, hash_key=hash_key).to_numpy(dtype=np.uint64, copy=True)
+
+
+def _id_text(ids):
+    # The same ID can arrive as text in one export and as a number in another
+    if pd.api.types.is_numeric_dtype(ids) and (ids.dropna() % 1 == 0).all():
+        ids = ids.astype('Int64')
+    return ids.astype('string').str.strip().replace('', pd.NA)
+
+
+def transaction_keys(df):
+    """uint64 key per row: the Transaction ID hash, or a fingerprint where there is no ID."""
+    fingerprint = pd.DataFrame({
+        col: df[col].astype('datetime64[ns]') if col == 'Date' else df[col]
+        for col in FINGERPRINT_COLUMNS if col in df.columns
+    })
+    keys = _hash(fingerprint, _FINGERPRINT_HASH_KEY)
+    if 'Transaction ID' in df.columns:
+        ids = _id_text(df['Transaction ID'])
+        has_id = ids.notna().to_numpy()
+        keys[has_id] = _hash(ids[has_id], _ID_HASH_KEY)
+    return keys
+
+
+class TransactionIndex:
+    """Keys of the transactions each loaded file contributed, for one session.
+
+    The keys of all files are also kept as one sorted array, so checking a new
+    file is a searchsorted per row rather than a pass over the loaded data.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.skipped = {}
+        self._all = np.array([], dtype=np.uint64)
+
+    @classmethod
+    def from_keys(cls, keys, skipped):
+        """Index over files whose keys were kept earlier (see utils/snapshot.py), given in load order."""
+        index = cls()
+        index.keys = dict(keys)
+        index.skipped = dict(skipped)
+        if keys:
+            # Each file kept only keys no earlier file had, so the union has no repeats
+            index._all = np.sort(np.concatenate(list(keys.values())))
+        return index
+
+    def _seen(self, keys):
+        if not len(self._all):
+            return np.zeros(len(keys), dtype=bool)
+        pos = np.minimum(np.searchsorted(self._all, keys), len(self._all) - 1)
+        return self._all[pos] == keys
+
+    def add(self, file_name, df):
+        """Register ``df`` as ``file_name`` and return the mask of its rows that aren't duplicates."""
+        keys = transaction_keys(df)
+        keep = ~self._seen(keys)
+        own = np.unique(keys[keep])
+        self.keys[file_name] = own
+        self.skipped[file_name] = int(len(keys) - keep.sum())
+        # Two sorted runs, which the stable sort merges in linear time
+        self._all = np.sort(np.concatenate([self._all, own]), kind='stable')
+        return keep
+
+    def remove(self, file_name):
+        """Forget ``file_name``; keys only it contributed count as new again."""
+        own = self.keys.pop(file_name, None)
+        self.skipped.pop(file_name, None)
+        if own is not None and len(own):
+            self._all = np.delete(self._all, np.searchsorted(self._all, own))
+
+    def dependents(self):
+        """Loaded files that skipped rows, whose duplicates may now belong to them."""
+        return [name for name, skipped in self.skipped.items() if skipped]
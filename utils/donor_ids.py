@@ -0,0 +1,83 @@
+"""Stable integer donor IDs assigned at ingest."""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Rows with neither an email nor an organization name
+UNKNOWN_DONOR = -1
+
+
+class DonorDictionary:
+    """Append-only mapping from a normalized donor key to a dense int32 donor ID.
+
+    The key is the lower-cased email, falling back to ``org:<name>`` for
+    organization gifts without an email. IDs never change once assigned, so
+    they stay valid as more files are appended or removed.
+    """
+
+    def __init__(self):
+        self.keys = pd.Index([], dtype=object)
+        self.labels = np.array([], dtype=object)
+        # Changes whenever keys are added; part of the dataset version
+        self.digest = ''
+
+    def __len__(self):
+        return len(self.keys)
+
+    def encode(self, df):
+        """Return the int32 donor ID of every row in ``df``, registering new donors."""
+        keys, labels = donor_keys(df)
+        codes, uniques = pd.factorize(keys)
+        ids = self.keys.get_indexer(uniques)
+
+        new = ids == -1
+        if new.any():
+            first_row = pd.Series(np.arange(len(codes))).groupby(codes).first().reindex(np.flatnonzero(new))
+            self.keys = self.keys.append(pd.Index(uniques[new], dtype=object))
+            self.digest = hashlib.sha1('\x1f'.join([self.digest, *uniques[new]]).encode()).hexdigest()
+            self.labels = np.concatenate([self.labels, labels[first_row.to_numpy()]])
+            ids = self.keys.get_indexer(uniques)
+
+        row_ids = np.full(len(codes), UNKNOWN_DONOR, dtype=np.int32)
+        known = codes >= 0
+        row_ids[known] = ids[codes[known]]
+        return row_ids
+
+    def label(self, donor_ids):
+        """Display label (original email or organization name) for each donor ID."""
+        return self.labels[np.asarray(donor_ids)]
+
+
+def donor_keys(df):
+    """Normalized donor key and display label per row; None where the donor is unknown."""
+    n = len(df)
+    keys = np.full(n, None, dtype=object)
+    labels = np.full(n, None, dtype=object)
+
+    if 'Email' in df.columns:
+        email = df['Email']
+        if isinstance(email.dtype, pd.CategoricalDtype):
+            # Normalize each distinct email once rather than every row
+            cats = email.cat.categories.astype(str)
+            normalized = cats.str.strip().str.lower().to_numpy(dtype=object)
+            codes = email.cat.codes.to_numpy()
+            has_email = codes >= 0
+            keys[has_email] = normalized[codes[has_email]]
+            labels[has_email] = cats.to_numpy(dtype=object)[codes[has_email]]
+        else:
+            has_email = email.notna().to_numpy()
+            keys[has_email] = email[has_email].astype(str).str.strip().str.lower().to_numpy(dtype=object)
+            labels[has_email] = email[has_email].astype(str).to_numpy(dtype=object)
+        # Blank emails count as missing
+        has_email &= keys != ''
+        keys[~has_email] = None
+
+    if 'Business/Organization Name' in df.columns:
+        org = df['Business/Organization Name']
+        use_org = pd.isna(keys) & org.notna().to_numpy()
+        names = org[use_org].astype(str).str.strip()
+        keys[use_org] = ('org:' + names.str.lower()).to_numpy(dtype=object)
+        labels[use_org] = names.to_numpy(dtype=object)
+
+    return keys, labels
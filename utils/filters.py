@@ -0,0 +1,179 @@
+"""Global date-range, campaign and donor-type filter shared by every page.
+
+The filter is set from the sidebar on any page and kept in
+st.session_state['data_filter']; session.get_donor_data() applies it. In
+memory the rows are found through a FilterIndex built once per dataset
+version: row positions ordered by Date, so a date range is a searchsorted
+slice, and the Campaign Title / Donor Type category codes, so a campaign or
+type filter is a lookup in a small table indexed by code. With the DuckDB
+store the filter becomes a WHERE clause on the session's Selection.
+
+Filtered data gets its own dataset version, so every cached aggregation is
+keyed by the rows it actually saw.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import store
+
+
+class DataFilter:
+    """Inclusive date range plus allowed campaigns and donor types; empty parts don't restrict."""
+
+    def __init__(self, start=None, end=None, campaigns=(), donor_types=()):
+        self.start = start
+        self.end = end
+        self.campaigns = tuple(campaigns)
+        self.donor_types = tuple(donor_types)
+
+    @property
+    def active(self):
+        return bool(self.start or self.end or self.campaigns or self.donor_types)
+
+    @property
+    def key(self):
+        """Stable text identifying the filter, for dataset versions."""
+        return repr((self.start, self.end, sorted(self.campaigns), sorted(self.donor_types)))
+
+    def end_bound(self):
+        """Exclusive upper bound: midnight after the end date."""
+        return None if self.end is None else pd.Timestamp(self.end) + pd.Timedelta(days=1)
+
+    def month_range(self):
+        """Inclusive ``(first, last)`` Donation Month codes if the filter is only a range of whole months, else None."""
+        if self.campaigns or self.donor_types or not (self.start or self.end):
+            return None
+        start, end = None if self.start is None else pd.Timestamp(self.start), self.end_bound()
+        if (start is not None and start.day != 1) or (end is not None and end.day != 1):
+            return None
+        return (0 if start is None else start.year * 12 + start.month - 1,
+                np.iinfo(np.int32).max if end is None else end.year * 12 + end.month - 2)
+
+
+def _code_table(categories, allowed):
+    """Boolean table indexed by category code; the extra last slot keeps code -1 (missing) False."""
+    table = np.zeros(len(categories) + 1, dtype=bool)
+    codes = categories.get_indexer(pd.Index(allowed))
+    table[codes[codes >= 0]] = True
+    return table
+
+
+class FilterIndex:
+    """Row positions by Date plus category codes, for filtering one dataset version."""
+
+    def __init__(self, df):
+        dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+        # NaT sorts last, so undated rows sit after every dated position
+        self.by_date = np.argsort(dates, kind='stable')
+        self.dated = int(np.count_nonzero(~np.isnat(dates)))
+        self.sorted_dates = dates[self.by_date[:self.dated]]
+        self.campaigns = df['Campaign Title'].cat.categories
+        self.campaign_codes = df['Campaign Title'].cat.codes.to_numpy()
+        self.donor_types = df['Donor Type'].cat.categories
+        self.type_codes = df['Donor Type'].cat.codes.to_numpy()
+
+    def options(self):
+        """``(first date, last date, campaigns, donor types)`` offered by the sidebar."""
+        first, last = (None, None) if not self.dated else (
+            pd.Timestamp(self.sorted_dates[0]).date(), pd.Timestamp(self.sorted_dates[-1]).date()
+        )
+        return first, last, list(self.campaigns), list(self.donor_types)
+
+    def rows(self, data_filter):
+        """Positions of the rows passing ``data_filter``, in frame order."""
+        if data_filter.start is None and data_filter.end is None:
+            rows = np.arange(len(self.campaign_codes))
+        else:
+            lo = 0 if data_filter.start is None else np.searchsorted(
+                self.sorted_dates, np.datetime64(pd.Timestamp(data_filter.start), 'ns'), 'left')
+            hi = self.dated if data_filter.end is None else np.searchsorted(
+                self.sorted_dates, np.datetime64(data_filter.end_bound(), 'ns'), 'left')
+            rows = self.by_date[lo:hi]
+        if data_filter.campaigns:
+            rows = rows[_code_table(self.campaigns, data_filter.campaigns)[self.campaign_codes[rows]]]
+        if data_filter.donor_types:
+            rows = rows[_code_table(self.donor_types, data_filter.donor_types)[self.type_codes[rows]]]
+        return np.sort(rows)
+
+
+def current():
+    """The session's filter."""
+    return st.session_state.get('data_filter') or DataFilter()
+
+
+def index(df, version):
+    """FilterIndex for ``df``, built at most once per dataset version."""
+    cached = st.session_state.get('filter_index')
+    if cached is None or cached[0] != version:
+        st.session_state['filter_index'] = cached = (version, FilterIndex(df))
+    return cached[1]
+
+
+def _options(data, version):
+    if isinstance(data, store.Selection):
+        cached = st.session_state.get('filter_options')
+        if cached is None or cached[0] != version:
+            st.session_state['filter_options'] = cached = (version, data.filter_options())
+        return cached[1]
+    return index(data, version).options()
+
+
+def _store_filter():
+    dates = st.session_state.get('filter_dates') or ()
+    if len(dates) != 2:
+        # Keep the applied range until both ends are picked
+        dates = (current().start, current().end)
+    start, end = dates
+    bounds = st.session_state.get('filter_bounds', (None, None))
+    st.session_state['data_filter'] = DataFilter(
+        # The full range is no restriction; undated gifts stay in
+        None if start == bounds[0] else start,
+        None if end == bounds[1] else end,
+        st.session_state.get('filter_campaigns', ()),
+        st.session_state.get('filter_types', ()),
+    )
+
+
+def _clear_filter():
+    st.session_state['data_filter'] = DataFilter()
+
+
+def sidebar():
+    """Filter controls in the sidebar. Stops the page if nothing matches the filter.
+
+    The widgets are re-seeded from st.session_state['data_filter'] on every
+    run, so the same filter carries over when another page draws them.
+    """
+    data = st.session_state.get('donor_data')
+    if data is None or data.empty:
+        return
+    version = st.session_state['dataset_version']
+    first, last, campaigns, donor_types = _options(data, version)
+    applied = current()
+
+    st.sidebar.markdown("### 🔎 Filter")
+    if first is not None:
+        start = min(max(applied.start or first, first), last)
+        end = max(min(applied.end or last, last), start)
+        st.session_state['filter_bounds'] = (first, last)
+        # A lone date is a range still being picked; leave it for the user to finish
+        if len(st.session_state.get('filter_dates') or ()) != 1:
+            st.session_state['filter_dates'] = (start, end)
+        st.sidebar.date_input("Date range", min_value=first, max_value=last, key='filter_dates',
+                              on_change=_store_filter)
+    st.session_state['filter_campaigns'] = [c for c in applied.campaigns if c in campaigns]
+    st.sidebar.multiselect("Campaigns", campaigns, key='filter_campaigns', placeholder="All campaigns",
+                           on_change=_store_filter)
+    st.session_state['filter_types'] = [t for t in applied.donor_types if t in donor_types]
+    st.sidebar.multiselect("Donor types", donor_types, key='filter_types', placeholder="All donor types",
+                           on_change=_store_filter)
+
+    if applied.active:
+        st.sidebar.button("Clear filter", on_click=_clear_filter, key='filter_clear')
+        shown = len(data.filtered(applied)) if isinstance(data, store.Selection) else \
+            len(index(data, version).rows(applied))
+        st.sidebar.caption(f"Showing {shown:,} of {len(data):,} gifts")
+        if not shown:
+            st.warning("No gifts match the current filter. Widen it in the sidebar.")
+            st.stop()
@@ -0,0 +1,56 @@
+"""Offline ZIP -> latitude/longitude lookup.
+
+Centroids come from a local CSV, loaded once per server process and shared by
+all sessions; nothing here touches the network. Seed the table with
+``python scripts/seed_zip_centroids.py`` on a connected machine, or point
+``CVC_ZIP_CENTROIDS`` at an existing file. An existing pgeocode cache
+(``US.txt``) is picked up as a fallback.
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+DEFAULT_CENTROIDS_PATH = Path(__file__).resolve().parent.parent / 'data' / 'us_zip_centroids.csv'
+
+
+def centroid_paths():
+    """Candidate centroid files, in lookup order."""
+    paths = []
+    if os.environ.get('CVC_ZIP_CENTROIDS'):
+        paths.append(Path(os.environ['CVC_ZIP_CENTROIDS']))
+    paths.append(DEFAULT_CENTROIDS_PATH)
+    pgeocode_dir = os.environ.get('PGEOCODE_DATA_DIR', Path.home() / '.cache' / 'pgeocode')
+    paths.append(Path(pgeocode_dir) / 'US.txt')
+    return paths
+
+
+def normalize_zip5(zips):
+    """Five-digit ZIP strings: drop any +4 suffix and restore leading zeros."""
+    return pd.Index(zips).astype(str).str.strip().str.split('-').str[0].str.zfill(5)
+
+
+@st.cache_resource(show_spinner=False)
+def load_centroids():
+    """ZIP-indexed frame of Latitude/Longitude, or None when no local table exists."""
+    for path in centroid_paths():
+        if not path.exists():
+            continue
+        table = pd.read_csv(path, usecols=['postal_code', 'latitude', 'longitude'],
+                            dtype={'postal_code': str, 'latitude': 'float32', 'longitude': 'float32'})
+        table = table.dropna()
+        table.index = normalize_zip5(table['postal_code'])
+        table = table[~table.index.duplicated()]
+        return table[['latitude', 'longitude']].rename(columns={'latitude': 'Latitude', 'longitude': 'Longitude'})
+    return None
+
+
+def attach_coordinates(zip_totals):
+    """Inner-join a frame with a 5-digit ``ZIP`` column onto the centroid table in one lookup."""
+    centroids = load_centroids()
+    if centroids is None:
+        return None
+    coords = centroids.reindex(zip_totals['ZIP'])
+    geo_df = zip_totals.assign(Latitude=coords['Latitude'].to_numpy(), Longitude=coords['Longitude'].to_numpy())
+    return geo_df.dropna(subset=['Latitude', 'Longitude'])
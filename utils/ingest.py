@@ -0,0 +1,235 @@
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from string import digits
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.utils.cell import column_index_from_string
+from pandas.io.parsers import TextParser
+
+from utils import parse_cache
+
+try:
+    from openpyxl.worksheet._reader import WorkSheetParser
+except ImportError:
+    # Internals of an untested openpyxl; iter_workbook_chunks() then uses the public API
+    WorkSheetParser = None
+from utils.schema import (
+    INGEST_SCHEMA, INGEST_SCHEMA_KEY, add_derived_columns, coerce_column, compact_frame, concat_frames, donor_type,
+    resolve_columns,
+)
+
+# Rows per frame when streaming a workbook
+STREAM_CHUNK_ROWS = 50_000
+
+# Workers used to parse several uncached workbooks at once
+INGEST_WORKERS = int(os.environ.get('CVC_INGEST_WORKERS', '0')) or os.cpu_count() or 1
+
+_pool = None
+
+
+def content_hash(data):
+    """SHA-256 of the raw upload bytes, used as the parse cache key."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_frame(df):
+    """Coerce a frame of schema columns to their dtypes, drop rows without a donor name and compact it."""
+    for col in INGEST_SCHEMA:
+        if col.name in df.columns:
+            df[col.name] = coerce_column(df[col.name], col.dtype)
+
+    # Safe filtering
+    first_name_series = df.get('First Name', pd.Series([None]*len(df), index=df.index))
+    org_name_series = df.get('Business/Organization Name', pd.Series([None]*len(df), index=df.index))
+    df = df[first_name_series.notna() | org_name_series.notna()].copy()
+
+    org_name_series = df.get('Business/Organization Name', pd.Series([None]*len(df), index=df.index))
+    df['Donor Type'] = donor_type(org_name_series)
+    return compact_frame(df.reset_index(drop=True))
+
+
+def _chunk_frame(rows, columns):
+    # TextParser applies the same per-column type inference as pd.read_excel
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    return TextParser(list(rows), names=columns).read()
+
+
+class _ProjectedSheetParser(WorkSheetParser or object):
+    """openpyxl's worksheet parser, converting only the cells of the ``keep`` columns.
+
+    Converting cells is most of the cost of reading a workbook, and most of a
+    wide export's columns aren't in the schema, so cells outside ``keep``
+    (1-based column numbers) are skipped before parse_cell(). Until ``keep``
+    is set, e.g. for the header row, every cell is parsed.
+    """
+
+    keep = None
+
+    def parse_row(self, row):
+        if self.keep is None:
+            return super().parse_row(row)
+        number = row.get('r')
+        self.row_counter = int(float(number)) if number else self.row_counter + 1
+        self.col_counter = 0
+        cells = []
+        for element in row:
+            coordinate = element.get('r')
+            column = column_index_from_string(coordinate.rstrip(digits)) if coordinate else self.col_counter + 1
+            if column in self.keep:
+                cells.append(self.parse_cell(element))
+            else:
+                self.col_counter = column
+        return self.row_counter, cells
+
+
+def _projected_rows(wb, ws, resolve):
+    """Rows after the header (row 2) through _ProjectedSheetParser, which relies on openpyxl internals.
+
+    ``resolve(header)`` returns ``{column number: slot}`` for the columns to
+    read; each row is yielded as a list of one value per slot.
+    """
+    with ws._get_source() as source:
+        parser = _ProjectedSheetParser(
+            source, ws._shared_strings, data_only=True, epoch=wb.epoch,
+            date_formats=wb._date_formats, timedelta_formats=wb._timedelta_formats,
+        )
+        rows = parser.parse()
+        # Row 1 is the export's title and row 2 its headers
+        header = []
+        for number, cells in rows:
+            if number >= 2:
+                if number == 2:
+                    header = [None] * max((cell['column'] for cell in cells), default=0)
+                    for cell in cells:
+                        header[cell['column'] - 1] = cell['value']
+                break
+        slots = resolve(header)
+        # Filtering cells only pays when some columns are skipped
+        parser.keep = set(slots) if len(slots) < len(header) else None
+
+        for _, cells in rows:
+            row = [None] * len(slots)
+            for cell in cells:
+                slot = slots.get(cell['column'])
+                if slot is not None:
+                    row[slot] = cell['value']
+            yield row
+
+
+def _public_rows(ws, resolve):
+    """Like _projected_rows(), through openpyxl's public API, which converts every cell."""
+    rows = ws.iter_rows(min_row=2, values_only=True)
+    slots = resolve(list(next(rows, ())))
+    positions = [column - 1 for column, _ in sorted(slots.items(), key=lambda item: item[1])]
+    for values in rows:
+        yield [values[p] if p < len(values) else None for p in positions]
+
+
+def iter_workbook_chunks(data, chunk_rows=STREAM_CHUNK_ROWS):
+    """Stream the first sheet in read-only mode, yielding normalized frames of at most ``chunk_rows`` rows.
+
+    Only INGEST_SCHEMA columns are read. The header (row 2) is resolved
+    against the schema before any data row is parsed, so an export missing a
+    required column raises SchemaError straight away.
+    """
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    names = []
+
+    def resolve(header):
+        columns = resolve_columns(header)
+        names.extend(name for _, name in columns)
+        return {position + 1: i for i, (position, _) in enumerate(columns)}
+
+    try:
+        ws = wb.worksheets[0]
+        internals = WorkSheetParser is not None and all(
+            hasattr(obj, attr) for obj, attr in [
+                (ws, '_get_source'), (ws, '_shared_strings'), (wb, '_date_formats'), (wb, '_timedelta_formats'),
+            ]
+        )
+        rows = _projected_rows(wb, ws, resolve) if internals else _public_rows(ws, resolve)
+        chunk = []
+        yielded = False
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield normalize_frame(_chunk_frame(chunk, names))
+                yielded = True
+                chunk = []
+        if chunk or not yielded:
+            yield normalize_frame(_chunk_frame(chunk, names))
+    finally:
+        wb.close()
+
+
+def read_workbook(data):
+    """Parse the schema columns of the first sheet of a GiveButter export (header on row 2)."""
+    return concat_frames(list(iter_workbook_chunks(data)))
+
+
+def _get_pool():
+    # One pool per server process, reused across reruns and sessions. Spawned
+    # workers avoid forking Streamlit's threads.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context('spawn')
+        )
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def load_uploads(uploads):
+    """Normalize ``(name, data)`` uploads, returning ``(name, content_hash, frame, error)`` in input order.
+
+    Cached workbooks are read straight from the parse cache; the rest are
+    parsed in a process pool when there is more than one of them.
+    """
+    keys = [content_hash(data) for _, data in uploads]
+    frames = [parse_cache.load(f"{key}-{INGEST_SCHEMA_KEY}") for key in keys]
+    errors = [None] * len(uploads)
+    misses = [i for i, df in enumerate(frames) if df is None]
+
+    if len(misses) > 1 and INGEST_WORKERS > 1:
+        pool = _get_pool()
+        futures = [(i, pool.submit(read_workbook, uploads[i][1])) for i in misses]
+        for i, future in futures:
+            try:
+                frames[i] = future.result()
+            except BrokenProcessPool as e:
+                errors[i] = e
+                _reset_pool()
+            except Exception as e:
+                errors[i] = e
+    else:
+        for i in misses:
+            try:
+                frames[i] = read_workbook(uploads[i][1])
+            except Exception as e:
+                errors[i] = e
+
+    results = []
+    for i, (name, _) in enumerate(uploads):
+        df = frames[i]
+        if errors[i] is None:
+            if i in misses:
+                parse_cache.store(f"{keys[i]}-{INGEST_SCHEMA_KEY}", df)
+            df = add_derived_columns(df)
+            df['Source File'] = pd.Categorical.from_codes(np.zeros(len(df), dtype='int8'), categories=[name])
+        results.append((name, keys[i], df, errors[i]))
+    return results
@@ -0,0 +1,70 @@
+"""Content-addressed on-disk cache of normalized upload frames.
+
+Entries are Parquet files named by the SHA-256 of the upload bytes. A hit
+refreshes the file's mtime, and the oldest entries are evicted once the cache
+grows past ``CACHE_MAX_BYTES``.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_DIR = Path(os.environ.get(
+    'CVC_PARSE_CACHE_DIR', Path(__file__).resolve().parent.parent / '.cache' / 'parsed'
+))
+CACHE_MAX_BYTES = int(os.environ.get('CVC_PARSE_CACHE_MAX_MB', '512')) * 1024 * 1024
+
+
+def _entry_path(key):
+    return CACHE_DIR / f"{key}.parquet"
+
+
+def load(key):
+    path = _entry_path(key)
+    try:
+        df = pd.read_parquet(path)
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return df
+
+
+def store(key, df):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, _entry_path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    except Exception:
+        # Columns pyarrow can't serialize (e.g. mixed object types) just skip caching
+        return
+    _evict()
+
+
+def _evict():
+    entries = []
+    for path in CACHE_DIR.glob('*.parquet'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
@@ -0,0 +1,90 @@
+"""Per-file partial aggregates behind the overview KPIs and charts.
+
+Ingest computes file_partials() once for each export. They hold its monthly
+sums, per-campaign sums and counts, per-ZIP sums, per-donor
+first/last/count/total and a monthly distinct-donor sketch, and live in st.session_state['file_partials'] under
+the file name. Adding a file adds its partials and removing one drops them.
+merge() then combines what is loaded, in time proportional to the partials
+(months, campaigns, ZIPs, donors) rather than the rows. The merged results
+are registered with artifacts.register() under the dataset version, so the
+analytics serve them the same way as a prebuilt report.
+"""
+import pandas as pd
+
+from utils import sketch
+from utils.donor_ids import UNKNOWN_DONOR
+from utils.schema import NO_DATE, concat_frames, month_starts
+from utils.summary import donor_partials, finish_donor_summary, merge_donor_partials
+
+
+def file_partials(df):
+    """Mergeable aggregates of one parsed export (with Donor ID assigned)."""
+    amount = df['Donation Amount']
+    dated = df['Date'].notna()
+    campaigns = pd.DataFrame({
+        'Campaign Title': df['Campaign Title'],
+        'sum': amount,
+        'count': amount.notna(),
+        'dated_rows': dated,
+        'dated_sum': amount.where(dated),
+        'dated_count': amount.notna() & dated,
+    }).groupby('Campaign Title', observed=True).sum().reset_index()
+
+    months = df['Donation Month'] != NO_DATE
+    known = (df['Donor ID'] != UNKNOWN_DONOR).to_numpy()
+    return {
+        'total_donations': float(amount.sum()),
+        'org_rows': int((df['Donor Type'] == 'Organization').sum()),
+        'monthly': amount[months].groupby(df['Donation Month'][months]).sum(),
+        'campaigns': campaigns,
+        'zips': df.groupby('ZIP', observed=True)['Donation Amount'].sum().reset_index() if 'ZIP' in df.columns else None,
+        'donors': donor_partials(df),
+        'donor_sketch': sketch.sketch_frame(
+            df['Donor ID'].to_numpy()[known], df['Donation Month'].to_numpy()[known], 'Donation Month'
+        ),
+    }
+
+
+def _campaign_summary(totals, prefix=''):
+    summary = pd.DataFrame({
+        'Campaign Title': totals['Campaign Title'],
+        'Total Raised': totals[f'{prefix}sum'],
+        'Donation Count': totals[f'{prefix}count'],
+    })
+    summary['Average Gift'] = summary['Total Raised'] / summary['Donation Count'].where(summary['Donation Count'] > 0)
+    return summary.reset_index(drop=True)
+
+
+def merge(partials, dictionary):
+    """``{artifact name: frame}`` for the loaded files' partials, given in load order.
+
+    The names and layouts match scripts/build_report.py's artifacts, plus the
+    finished ``donor_summary``.
+    """
+    donors = merge_donor_partials([p['donors'] for p in partials])
+
+    monthly = pd.concat([p['monthly'] for p in partials]).groupby(level=0).sum().sort_index()
+    monthly = pd.DataFrame({'Month': month_starts(monthly.index), 'Donation Amount': monthly.to_numpy()})
+    monthly['Cumulative Total'] = monthly['Donation Amount'].cumsum()
+
+    campaigns = concat_frames([p['campaigns'] for p in partials]).groupby('Campaign Title', observed=True).sum()
+    campaigns = campaigns.reset_index()
+
+    results = {
+        'overview_stats': pd.DataFrame([{
+            'total_donations': sum(p['total_donations'] for p in partials),
+            'unique_donors': len(donors),
+            'repeat_donors': int((donors['Rows'] > 1).sum()),
+            'org_donors': sum(p['org_rows'] for p in partials),
+        }]),
+        'monthly_totals': monthly,
+        'campaign_summary': _campaign_summary(campaigns),
+        'campaign_summary_dated': _campaign_summary(campaigns[campaigns['dated_rows'] > 0], 'dated_'),
+        'donor_summary': finish_donor_summary(donors, dictionary),
+        'donor_sketch': sketch.merge([p['donor_sketch'] for p in partials], 'Donation Month'),
+    }
+    zips = [p['zips'] for p in partials if p['zips'] is not None]
+    if zips:
+        results['zip_summary'] = concat_frames(zips).groupby('ZIP', observed=True)['Donation Amount'].sum() \
+            .sort_values(ascending=False).reset_index()
+    return results
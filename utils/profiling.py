@@ -0,0 +1,215 @@
+"""Per-section timing and memory instrumentation, switched on per session.
+
+Each page calls begin() at the top and panel() at the bottom, and wraps its
+sections in ``with section("Pareto Principle", rows=...) as prof:``. While
+profiling is on (sidebar toggle, or CVC_PROFILE=1 to start with it on) every
+section records its wall time, the rows it processed, its peak Python
+allocation (tracemalloc) and the serialized size of the charts passed through
+``prof.chart()``. The sidebar panel shows the current run. The download
+button exports every run this session kept as JSON.
+
+Sections with their own widgets are st.fragment functions decorated with
+fragment(), so a widget reruns only its section. Such a rerun is recorded as
+a separate run named after the page and the function; the panel and the
+download pick it up on the next full page run.
+
+tracemalloc is process-wide and slows every session on the server several
+times over while it runs, so it runs only while some live session has
+profiling on and stops when the last one switches it off. Peaks can include
+allocations from other sessions profiling at the same time.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+DEFAULT_ON = os.environ.get('CVC_PROFILE', '') not in ('', '0')
+
+# Runs kept per session for the JSON export
+MAX_RUNS = 50
+
+# Sections currently open in this script thread, innermost last
+_open = threading.local()
+
+_tracing_lock = threading.Lock()
+
+
+def enabled():
+    return st.session_state.get('profiling_enabled', DEFAULT_ON)
+
+
+@st.cache_resource(show_spinner=False)
+def _tracing_sessions():
+    """IDs of the sessions on this server with profiling on."""
+    return set()
+
+
+def _update_tracing(on):
+    """Record whether this session profiles, and trace memory only while some live session does."""
+    ctx = get_script_run_ctx()
+    sessions = _tracing_sessions()
+    with _tracing_lock:
+        if ctx is not None:
+            if on:
+                sessions.add(ctx.session_id)
+            else:
+                sessions.discard(ctx.session_id)
+        if Runtime.exists():
+            # Sessions that closed with profiling on
+            runtime = Runtime.instance()
+            sessions.difference_update([s for s in sessions if not runtime.is_active_session(s)])
+        if sessions and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not sessions and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _payload_size(chart):
+    try:
+        payload = chart.to_json()
+    except TypeError:
+        # Altair leaves e.g. Period values to the JSON encoder; Streamlit stringifies them
+        payload = json.dumps(chart.to_dict(), default=str)
+    return len(payload.encode())
+
+
+class Section:
+    """Measurements for one named section of a page run."""
+
+    def __init__(self, name, rows=None, measure=True):
+        self.name = name
+        self.rows = rows
+        self.measure = measure
+        self.seconds = 0.0
+        self.peak_bytes = 0
+        self.chart_bytes = 0
+        self.charts = 0
+        self._base = 0
+
+    def chart(self, chart):
+        """Count ``chart``'s serialized size (Altair or Plotly) and return it unchanged."""
+        if self.measure and hasattr(chart, 'to_json'):
+            self.chart_bytes += _payload_size(chart)
+            self.charts += 1
+        return chart
+
+    def _note_peak(self):
+        self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1] - self._base)
+
+    def as_dict(self):
+        return {
+            'section': self.name,
+            'seconds': round(self.seconds, 6),
+            'rows': None if self.rows is None else int(self.rows),
+            'peak_bytes': self.peak_bytes,
+            'chart_bytes': self.chart_bytes,
+            'charts': self.charts,
+        }
+
+
+@contextmanager
+def section(name, rows=None):
+    """Time and measure the enclosed block as section ``name`` of this run."""
+    if not enabled():
+        yield Section(name, rows, measure=False)
+        return
+
+    # Peaks stay 0 while tracemalloc is off, e.g. outside a Streamlit session
+    stack = getattr(_open, 'stack', None)
+    if stack is None:
+        stack = _open.stack = []
+    if stack:
+        # Resetting the peak below would hide the enclosing section's peak so far
+        stack[-1]._note_peak()
+
+    record = Section(name, rows)
+    record._base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    stack.append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - started
+        record._note_peak()
+        stack.pop()
+        run = st.session_state.get('profile_runs', [])
+        if run:
+            run[-1]['sections'].append(record.as_dict())
+
+
+def profiled(name):
+    """Decorator form of section()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _start_run(page):
+    runs = st.session_state.setdefault('profile_runs', [])
+    runs.append({'page': page, 'started': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                 'sections': []})
+    del runs[:-MAX_RUNS]
+
+
+def begin(page):
+    """Start this run's record; shows the sidebar toggle. Call at the top of every page."""
+    on = st.sidebar.toggle("⏱️ Profile sections", value=enabled(), key='profiling_toggle')
+    st.session_state['profiling_enabled'] = on
+    _update_tracing(on)
+    st.session_state['profile_page'] = page
+    # Cleared by panel(); a fragment running while it is unset is rerunning on its own
+    st.session_state['profile_full_run'] = True
+    if on:
+        _start_run(page)
+
+
+def fragment(func):
+    """st.fragment that records its reruns on their own as separate profiling runs."""
+    @st.fragment
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if enabled() and not st.session_state.get('profile_full_run'):
+            _start_run(f"{st.session_state.get('profile_page', '')} › {func.__name__}")
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def panel():
+    """Sidebar table of this run's sections plus a JSON download. Call at the bottom of every page."""
+    st.session_state['profile_full_run'] = False
+    runs = st.session_state.get('profile_runs')
+    if not enabled() or not runs:
+        return
+    current = runs[-1]
+    with st.sidebar.expander(f"⏱️ Profile: {current['page']}", expanded=True):
+        if not current['sections']:
+            st.caption("No sections ran.")
+        else:
+            table = pd.DataFrame(current['sections'])
+            table['Time (ms)'] = table['seconds'] * 1000
+            table['Peak (MB)'] = table['peak_bytes'] / 1024**2
+            table['Charts (KB)'] = table['chart_bytes'] / 1024
+            st.dataframe(
+                table[['section', 'Time (ms)', 'rows', 'Peak (MB)', 'Charts (KB)']].rename(
+                    columns={'section': 'Section', 'rows': 'Rows'}
+                ).round(2),
+                hide_index=True, width='stretch'
+            )
+        st.download_button(
+            "Download profile (JSON)", json.dumps(runs, indent=2), file_name="cvc_profile.json",
+            mime="application/json", key='profiling_download'
+        )
@@ -0,0 +1,72 @@
+"""Headless analytics run behind scripts/build_report.py."""
+import html
+
+import pandas as pd
+
+from utils import analytics
+from utils.summary import build_donor_summary
+
+# Rows shown per table in the HTML report; the Parquet files hold everything
+HTML_ROWS = 50
+
+
+def build_artifacts(key, df, dictionary):
+    """Run the dashboard analyses on ``df`` and return ``{name: frame}``."""
+    donor_summary = build_donor_summary(df, dictionary)
+    return {
+        'overview_stats': pd.DataFrame([analytics.overview_stats(key, df)]),
+        'monthly_totals': analytics.monthly_totals(key, df),
+        'campaign_summary': analytics.campaign_summary(key, df),
+        'campaign_summary_dated': analytics.campaign_summary(key, df, dated_only=True),
+        'zip_summary': analytics.zip_summary(key, df).reset_index(),
+        'retention_counts': analytics.retention_counts(key, donor_summary),
+        'pareto': analytics.pareto_table(key, donor_summary),
+        'churn': analytics.churn_table(key, df),
+        'cohort_retention': analytics.cohort_table(key, df, 'retention'),
+        'cohort_monetary': analytics.cohort_table(key, df, 'monetary'),
+    }
+
+
+def _table(title, frame):
+    shown = frame.head(HTML_ROWS)
+    note = f"<p class='note'>First {HTML_ROWS:,} of {len(frame):,} rows.</p>" if len(frame) > HTML_ROWS else ''
+    return f"<h2>{html.escape(title)}</h2>{note}{shown.to_html(index=False, float_format='{:,.2f}'.format, border=0)}"
+
+
+def render_html(artifacts, file_names):
+    """Static HTML report of the artifacts, with no external assets."""
+    stats = artifacts['overview_stats'].to_dict('records')[0]
+    pareto = artifacts['pareto']
+    top20 = pareto.head(max(1, len(pareto) // 5))['Donation Amount'].sum() / max(pareto['Donation Amount'].sum(), 1) * 100
+    cohort_pivot = artifacts['cohort_retention'].pivot(
+        index='Cohort Label', columns='Quarter Index', values='Retention Rate (%)'
+    ).reset_index()
+    sections = [
+        _table("Monthly Totals", artifacts['monthly_totals']),
+        _table("Campaign Performance", artifacts['campaign_summary'].sort_values('Total Raised', ascending=False)),
+        _table("Top Donors (Pareto)", pareto),
+        _table("Retention", artifacts['retention_counts']),
+        _table("Quarterly Churn", artifacts['churn'].reset_index(drop=True)),
+        _table("Cohort Retention (%)", cohort_pivot),
+        _table("ZIP Totals", artifacts['zip_summary']),
+    ]
+    files = ''.join(f"<li><code>{html.escape(name)}</code></li>" for name in file_names)
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>CVC Donor Insights Report</title>
+<style>
+body {{ font-family: sans-serif; color: #1F3C4C; margin: 2rem; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5rem; }}
+th, td {{ padding: 0.25rem 0.75rem; border-bottom: 1px solid #ddd; text-align: right; }}
+th {{ background: #f5f5f5; }}
+.note {{ color: #666; font-size: 0.9rem; }}
+</style></head><body>
+<h1>CVC Donor Insights Report</h1>
+<p>Total raised: <b>${stats['total_donations']:,.2f}</b> &middot;
+Unique donors: <b>{stats['unique_donors']:,}</b> &middot;
+Repeat donors: <b>{stats['repeat_donors']:,}</b> &middot;
+Organization gifts: <b>{stats['org_donors']:,}</b> &middot;
+Top 20% of donors gave <b>{top20:.1f}%</b></p>
+<ul>{files}</ul>
+{''.join(sections)}
+</body></html>
+"""
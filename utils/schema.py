@@ -0,0 +1,213 @@
+"""Ingest schema, compact dtypes and ingest-time derived columns for the session donor frame."""
+import hashlib
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+class SchemaError(ValueError):
+    """An export's header row lacks a column the dashboard requires."""
+
+
+class ExportColumn:
+    """An export column the dashboard reads.
+
+    ``name`` is its name in the donor frame, ``aliases`` other headers it
+    arrives under, and ``dtype`` what ingest coerces it to: 'datetime64',
+    'float64' or 'str', 'category' for columns compact_frame() stores as
+    categoricals, or 'object' to keep the parsed values.
+    """
+
+    def __init__(self, name, dtype, required=False, aliases=()):
+        self.name = name
+        self.dtype = dtype
+        self.required = required
+        self.aliases = tuple(aliases)
+
+    @property
+    def headers(self):
+        return (self.name,) + self.aliases
+
+
+# The only export columns ingest keeps, in frame order; every other column is skipped at parse time
+INGEST_SCHEMA = [
+    # Text in some exports and numbers in others; dedupe.transaction_keys() reconciles them
+    ExportColumn('Transaction ID', 'object'),
+    ExportColumn('Date', 'datetime64', required=True, aliases=['Transaction Date (UTC)']),
+    ExportColumn('Donation Amount', 'float64', required=True, aliases=['Amount']),
+    ExportColumn('First Name', 'str'),
+    ExportColumn('Last Name', 'str'),
+    ExportColumn('Email', 'category'),
+    ExportColumn('Business/Organization Name', 'str'),
+    ExportColumn('Campaign Title', 'category', required=True),
+    # Excel's ints, floats and strings are made text by compact_frame()
+    ExportColumn('ZIP', 'category', aliases=['Postal Code']),
+]
+
+# Changes with the schema, so frames parsed under an older one aren't reused
+INGEST_SCHEMA_KEY = hashlib.sha1(repr([
+    (col.name, col.dtype, col.required, col.aliases) for col in INGEST_SCHEMA
+]).encode()).hexdigest()[:12]
+
+
+def resolve_columns(headers):
+    """``[(position, name)]`` of the schema columns in an export's header row, in schema order.
+
+    Headers match ignoring case and surrounding whitespace. A column's own
+    name is preferred over its aliases, and the first of repeated headers
+    wins. Raises SchemaError if a required column is missing.
+    """
+    positions = {}
+    for i, header in enumerate(headers):
+        if header is not None:
+            positions.setdefault(str(header).strip().casefold(), i)
+    found, missing = [], []
+    for col in INGEST_SCHEMA:
+        matches = [positions[h.casefold()] for h in col.headers if h.casefold() in positions]
+        if matches:
+            found.append((matches[0], col.name))
+        elif col.required:
+            missing.append(col.name + ''.join(f" (or '{alias}')" for alias in col.aliases))
+    if missing:
+        raise SchemaError(f"missing required column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+    return found
+
+
+def coerce_column(values, dtype):
+    """``values`` converted to an ExportColumn dtype; unparseable dates and amounts become missing."""
+    if dtype == 'datetime64':
+        return pd.to_datetime(values, errors='coerce')
+    if dtype == 'float64':
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+    if dtype == 'str':
+        return values.astype('str')
+    return values
+
+# Repetitive string columns stored as categoricals in st.session_state['donor_data']
+CATEGORICAL_COLUMNS = ['Email', 'Campaign Title', 'Campaign Clean', 'ZIP', 'Source File', 'Donor Type']
+DONOR_TYPES = ['Individual', 'Organization']
+
+# Calendar codes derived from Date at ingest; NO_DATE marks rows without a date
+PERIOD_COLUMNS = {'Donation Month': np.int32, 'Donation Quarter': np.int32, 'Donation Year': np.int16}
+NO_DATE = -1
+
+# Trailing year in campaign names, e.g. "Spring Gala 2024"
+CAMPAIGN_YEAR = re.compile(r'\s*\d{4}$')
+
+
+def donor_type(org_names):
+    """Vectorized Donor Type: 'Organization' when an organization name is present."""
+    return pd.Categorical(
+        np.where(org_names.notna(), 'Organization', 'Individual'), categories=DONOR_TYPES
+    )
+
+
+def _zip_codes(series):
+    # Excel hands back ZIPs as a mix of ints, floats and strings; store them all as text
+    numeric = pd.to_numeric(series, errors='coerce')
+    whole = numeric.notna() & (numeric % 1 == 0)
+    zips = series.astype('str').str.strip()
+    zips[whole] = numeric[whole].astype('int64').astype('str')
+    return zips
+
+
+def compact_frame(df):
+    """Convert the schema's string columns to categoricals in place and return the frame."""
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        values = _zip_codes(df[col]) if col == 'ZIP' else df[col]
+        df[col] = values.astype('category')
+    return df
+
+
+def clean_campaigns(titles):
+    """Campaign titles without a trailing year, cleaned once per distinct title."""
+    titles = titles if isinstance(titles.dtype, pd.CategoricalDtype) else titles.astype('category')
+    cleaned = titles.cat.categories.astype(str).str.replace(CAMPAIGN_YEAR, '', regex=True)
+    codes, uniques = pd.factorize(cleaned, sort=True)
+    title_codes = titles.cat.codes.to_numpy()
+    clean_codes = np.where(title_codes >= 0, codes[title_codes], -1)
+    return pd.Categorical.from_codes(clean_codes, categories=uniques)
+
+
+def add_derived_columns(df):
+    """Add the calendar codes and the cleaned campaign name in place and return the frame.
+
+    Month, quarter and year are stored as absolute integer codes
+    (year * 12 + month - 1, year * 4 + quarter - 1, year) so that pages can
+    group on them without re-deriving anything from Date.
+    """
+    dates = df['Date'] if 'Date' in df.columns else pd.Series(pd.NaT, index=df.index, dtype='datetime64[s]')
+    year = dates.dt.year.to_numpy(dtype=np.float64)
+    month0 = dates.dt.month.to_numpy(dtype=np.float64) - 1
+    dated = ~np.isnan(year)
+    for col, values in [('Donation Month', year * 12 + month0),
+                        ('Donation Quarter', year * 4 + month0 // 3),
+                        ('Donation Year', year)]:
+        codes = np.full(len(df), NO_DATE, dtype=PERIOD_COLUMNS[col])
+        codes[dated] = values[dated]
+        df[col] = codes
+    if 'Campaign Title' in df.columns:
+        df['Campaign Clean'] = clean_campaigns(df['Campaign Title'])
+    return df
+
+
+def month_starts(codes):
+    """First day of the month for absolute month codes."""
+    codes = np.asarray(codes, dtype=np.int64)
+    return pd.to_datetime(pd.DataFrame({'year': codes // 12, 'month': codes % 12 + 1, 'day': 1}))
+
+
+def _categorical(series):
+    series = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    categories = series.cat.categories
+    # 'string' and 'str' categories (e.g. a fresh parse and a Parquet cache hit) can't be unioned
+    if isinstance(categories.dtype, pd.StringDtype) and categories.dtype != 'str':
+        series = series.cat.rename_categories(categories.astype('str'))
+    return series
+
+
+def concat_frames(frames):
+    """Concatenate frames while keeping the categorical columns categorical."""
+    frames = [f for f in frames if len(f.columns)]
+    if not frames:
+        return pd.DataFrame()
+    for col in CATEGORICAL_COLUMNS:
+        present = [f[col] for f in frames if col in f.columns]
+        if not present:
+            continue
+        categories = union_categoricals([_categorical(s) for s in present], ignore_order=True).categories
+        dtype = pd.CategoricalDtype(categories)
+        frames = [
+            f.assign(**{col: f[col].astype(dtype) if col in f.columns else pd.Categorical([None] * len(f), dtype=dtype)})
+            for f in frames
+        ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def prune_categories(df):
+    """Drop categories no longer referenced, e.g. after a file is removed."""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+def memory_saved(df):
+    """Bytes saved by the categorical columns versus Python-object string columns."""
+    saved = 0
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns or not isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        codes = df[col].cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(df[col].cat.categories))
+        sizes = np.fromiter((sys.getsizeof(c) for c in df[col].cat.categories), dtype=np.int64,
+                            count=len(df[col].cat.categories))
+        # One pointer per row plus one string object per non-null row
+        object_bytes = 8 * len(codes) + int((counts * sizes).sum())
+        saved += object_bytes - int(df[col].memory_usage(index=False, deep=True))
+    return saved
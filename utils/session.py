@@ -0,0 +1,113 @@
+"""Session-state helpers shared by Home.py and the pages."""
+import hashlib
+import os
+
+import streamlit as st
+
+from utils import analytics, artifacts, filters, partials, sketch, store
+from utils.schema import prune_categories
+from utils.summary import build_donor_summary
+
+# Whether distinct donor counts start out approximate; the sidebar toggle changes it per session
+APPROXIMATE_DEFAULT = os.environ.get('CVC_APPROXIMATE', '0') not in ('', '0')
+
+
+def update_dataset_version():
+    """Recompute the dataset version after files are added or removed.
+
+    The version hashes the loaded files' content hashes, in load order, together
+    with the donor dictionary digest, so equal versions mean identical frames.
+    The loaded files' merged partial aggregates, and a prebuilt report for the
+    same exports if there is one, are registered under the new version.
+    """
+    parts = [st.session_state['donor_dictionary'].digest]
+    parts += [f"{name}:{key}" for name, key in st.session_state['file_hashes'].items()]
+    version = hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()
+    st.session_state['dataset_version'] = version
+
+    file_partials = st.session_state.get('file_partials', {})
+    loaded = [file_partials[name] for name in st.session_state['file_hashes']
+              if name in file_partials]
+    frames = partials.merge(loaded, st.session_state['donor_dictionary']) if loaded else {}
+    report = artifacts.read(artifacts.content_key(st.session_state['file_hashes'].values()))
+    if report is not None:
+        frames.update(report)
+    if frames:
+        artifacts.register(version, frames)
+    st.session_state['precomputed_report'] = report is not None
+
+
+def get_dataset_version():
+    """Version of the data get_donor_data() returns, including the filter."""
+    version = st.session_state['dataset_version']
+    data_filter = filters.current()
+    if not data_filter.active:
+        return version
+    return hashlib.sha1(f"{version}\x1f{data_filter.key}".encode()).hexdigest()
+
+
+def get_donor_data():
+    """The session's donor data with the filter applied, as a view pages can't use to change it."""
+    data = st.session_state['donor_data']
+    data_filter = filters.current()
+    if isinstance(data, store.Selection):
+        return data.filtered(data_filter) if data_filter.active else data
+    if not data_filter.active or data.empty:
+        # Shares the column buffers until a page writes to one (copy-on-write)
+        return data.copy(deep=False)
+
+    version = get_dataset_version()
+    cached = st.session_state.get('filtered_data')
+    if cached is None or cached[0] != version:
+        rows = filters.index(data, st.session_state['dataset_version']).rows(data_filter)
+        st.session_state['filtered_data'] = cached = (
+            version, prune_categories(data.take(rows).reset_index(drop=True))
+        )
+    return cached[1].copy(deep=False)
+
+
+def get_donor_summary():
+    """Donor summary for the current (filtered) dataset version, built at most once per version."""
+    version = get_dataset_version()
+    cached = st.session_state.get('donor_summary')
+    if cached is None or cached[0] != version:
+        # Merged from the per-file partials, unless a filter is set
+        summary = artifacts.lookup(version, 'donor_summary')
+        if summary is None:
+            data = get_donor_data()
+            if isinstance(data, store.Selection):
+                summary = data.donor_summary()
+            else:
+                summary = build_donor_summary(data, st.session_state['donor_dictionary'])
+        st.session_state['donor_summary'] = cached = (version, summary)
+    return cached[1]
+
+
+def get_donor_sketch():
+    """Monthly donor sketch of get_donor_data(); whole-month filters reuse the merged sketches."""
+    merged = artifacts.lookup(st.session_state['dataset_version'], 'donor_sketch')
+    months = filters.current().month_range()
+    if merged is not None and months is not None:
+        codes = merged['Donation Month']
+        return merged[(codes >= months[0]) & (codes <= months[1])].reset_index(drop=True)
+    return analytics.donor_sketch(get_dataset_version(), get_donor_data())
+
+
+def approximate_counts():
+    """Whether distinct donor counts are estimated from sketches rather than counted."""
+    return st.session_state.get('approximate_counts', APPROXIMATE_DEFAULT)
+
+
+def _store_approximate():
+    st.session_state['approximate_counts'] = st.session_state['approximate_toggle']
+
+
+def approximate_toggle():
+    """Sidebar switch between exact and approximate distinct counts, kept across pages."""
+    st.session_state['approximate_toggle'] = approximate_counts()
+    st.sidebar.toggle(
+        "⚡ Approximate distinct counts", key='approximate_toggle', on_change=_store_approximate,
+        help=f"Estimate unique donors and cohort retention from HyperLogLog sketches "
+             f"instead of counting every donor. Unique donors are within about "
+             f"±{sketch.RELATIVE_ERROR:.1%}; each cohort cell shows its own margin.",
+    )
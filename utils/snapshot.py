@@ -0,0 +1,393 @@
+"""Session snapshots in Arrow IPC files, reopened through memory-mapping.
+
+A browser refresh or a new tab starts with an empty st.session_state. After
+every upload change Home.py calls save(), which writes the session's data to
+``<CVC_SNAPSHOT_DIR>/<token>/<dataset version>/`` on a background thread, one
+uncompressed Arrow IPC file per frame plus manifest.json. That covers the
+donor frame, the frames registered for the version (merged partials, donor
+summary, prebuilt report), each file's partials and transaction keys, and the
+donor dictionary. ``latest`` names the token's newest snapshot, and its older
+ones are removed.
+
+The token is a random ``?snapshot=`` query parameter that save() adds to the
+URL, so a refresh or a copied link finds the snapshot and other visitors
+never see it. Tokens unused for CVC_SNAPSHOT_RETENTION_HOURS are deleted.
+
+When a session has no data yet, restore() opens its token's latest snapshot with
+pyarrow.memory_map. Fixed-width columns (numbers, dates, category codes)
+become numpy views of the mapped buffers and string columns stay Arrow
+arrays, so restoring copies no column data. Sessions that restore the same
+snapshot share the OS page cache. Set CVC_SNAPSHOT=0 to turn snapshots off.
+"""
+import json
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from utils import artifacts, store
+from utils.dedupe import TransactionIndex
+from utils.donor_ids import DonorDictionary
+
+ENABLED = os.environ.get('CVC_SNAPSHOT', '1') not in ('', '0')
+SNAPSHOT_DIR = Path(os.environ.get(
+    'CVC_SNAPSHOT_DIR', Path(__file__).resolve().parent.parent / '.cache' / 'snapshots'
+))
+RETENTION_HOURS = float(os.environ.get('CVC_SNAPSHOT_RETENTION_HOURS', '168'))
+
+# Query parameter holding the browser's snapshot token
+TOKEN_PARAM = 'snapshot'
+_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]{16,64}')
+
+# Bumped when the files or the session state they restore change shape
+FORMAT = 2
+
+# Session state that restore() sets; clear() also drops what was derived from it
+SESSION_KEYS = [
+    'donor_data', 'uploaded_file_names', 'last_uploaded_files', 'donor_dictionary', 'file_hashes',
+    'file_partials', 'transaction_index', 'dataset_version', 'precomputed_report', 'memory_saved',
+    'restored_snapshot', 'snapshot_version',
+]
+_DERIVED_KEYS = ['donor_summary', 'filtered_data', 'filter_index', 'filter_options', 'data_filter']
+
+# Frames in each file's partials (utils/partials.py); the rest are scalars kept in the manifest
+_PARTIAL_FRAMES = ['monthly', 'campaigns', 'zips', 'donors', 'donor_sketch']
+
+
+def _column(series):
+    """Arrow array sharing the column's buffers.
+
+    NaN, NaT and the -1 category code stay in the values buffer, which is
+    what _series() reads back, so the column round-trips without nulls being
+    converted.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        # Arrow marks the -1 codes null but leaves them in the indices buffer
+        indices = pa.array(codes, mask=codes < 0)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(dtype.categories))
+    if dtype.kind in 'iufbM':
+        values = np.ascontiguousarray(series.to_numpy())
+        arrow_type = pa.uint8() if dtype.kind == 'b' else pa.from_numpy_dtype(dtype)
+        return pa.Array.from_buffers(arrow_type, len(values), [None, pa.py_buffer(values)])
+    return pa.array(series)
+
+
+def _field_meta(series):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {'dtype': 'category', 'categories': str(dtype.categories.dtype)}
+    return {'dtype': str(dtype), 'fixed': dtype.kind in 'iufbM'}
+
+
+def _values(array, dtype):
+    """Values buffer of a fixed-width Arrow array as a read-only numpy view."""
+    return np.frombuffer(array.buffers()[1], dtype=dtype, count=len(array), offset=array.offset * dtype.itemsize)
+
+
+def _series(column, meta):
+    if not len(column):
+        # An empty table has no record batches to map
+        if meta['dtype'] == 'category':
+            return pd.Categorical([], categories=pd.Index([], dtype=meta['categories']))
+        return pd.Series([], dtype=meta['dtype'])
+    array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    if meta['dtype'] == 'category':
+        categories = pd.Index(array.dictionary.to_pandas()).astype(meta['categories'])
+        codes = _values(array.indices, np.dtype(array.indices.type.to_pandas_dtype()))
+        return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories), validate=False)
+    if meta['fixed']:
+        return _values(array, np.dtype(meta['dtype']))
+    values = array.to_pandas()
+    return values if str(values.dtype) == meta['dtype'] else values.astype(meta['dtype'])
+
+
+def _write(path, obj):
+    """Write a DataFrame or Series, with its index unless it is the default one."""
+    frame = obj.to_frame() if isinstance(obj, pd.Series) else obj
+    index = frame.index
+    default_index = isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+    if not default_index:
+        frame = frame.reset_index()
+    fields = {col: _field_meta(frame[col]) for col in frame.columns}
+    table = pa.table({col: _column(frame[col]) for col in frame.columns})
+    table = table.replace_schema_metadata({'cvc': json.dumps({
+        'fields': fields,
+        'index': None if default_index else {'columns': list(frame.columns[:index.nlevels]), 'names': list(index.names)},
+        'series': isinstance(obj, pd.Series),
+    })})
+    with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read(path):
+    """Memory-map a file written by _write() and rebuild the frame or series without copying columns."""
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    meta = json.loads(table.schema.metadata[b'cvc'])
+    frame = pd.DataFrame(
+        {col: _series(table.column(col), meta['fields'][col]) for col in table.column_names}, copy=False
+    )
+    if meta['index'] is not None:
+        levels = [frame.pop(col) for col in meta['index']['columns']]
+        names = meta['index']['names']
+        frame.index = pd.Index(levels[0], name=names[0]) if len(levels) == 1 else \
+            pd.MultiIndex.from_arrays(levels, names=names)
+    return frame.iloc[:, 0] if meta['series'] else frame
+
+
+@st.cache_resource
+def _writer():
+    """One thread writing snapshots, so saving doesn't hold up the script run."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot')
+
+
+@st.cache_resource
+def _pending():
+    """``{token: Future}`` of the last write submitted for each token."""
+    return {}
+
+
+def _token(create=False):
+    """The session's snapshot token, also kept in the URL; a new one if ``create``."""
+    token = st.session_state.get('snapshot_token') or st.query_params.get(TOKEN_PARAM)
+    if token is None or not _TOKEN_PATTERN.fullmatch(token):
+        if not create:
+            return None
+        token = secrets.token_urlsafe(16)
+    st.session_state['snapshot_token'] = token
+    # Page links drop the query string, so put it back for a refresh to find
+    if st.query_params.get(TOKEN_PARAM) != token:
+        st.query_params[TOKEN_PARAM] = token
+    return token
+
+
+def _wait(token):
+    future = _pending().get(token)
+    if future is not None:
+        future.result()
+
+
+def _latest(folder):
+    try:
+        name = (folder / 'latest').read_text().strip()
+    except OSError:
+        return None
+    return folder / name if name else None
+
+
+def _point_latest(folder, name):
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(name)
+    os.replace(tmp_path, folder / 'latest')
+
+
+def _remove_others(folder, keep):
+    # Tabs that mapped an older snapshot keep reading it until they drop it
+    for path in folder.iterdir():
+        if path.is_dir() and path.name != keep and not path.name.startswith('.tmp-'):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _remove_expired():
+    cutoff = time.time() - RETENTION_HOURS * 3600
+    for folder in SNAPSHOT_DIR.iterdir():
+        latest = folder / 'latest'
+        try:
+            expired = folder.is_dir() and latest.stat().st_mtime < cutoff
+        except OSError:
+            continue
+        if expired:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def save():
+    """Snapshot the session's data under its token, once per dataset version."""
+    state = st.session_state
+    if not ENABLED or state['donor_data'].empty or state.get('snapshot_version') == state['dataset_version']:
+        return
+    state['snapshot_version'] = state['dataset_version']
+    token = _token(create=True)
+    _pending()[token] = _writer().submit(_save, SNAPSHOT_DIR / token, _capture())
+
+
+def _capture():
+    """What _write_session() needs, taken now so later uploads can't change it mid-write."""
+    state = st.session_state
+    dictionary = state['donor_dictionary']
+    index = state['transaction_index']
+    return {
+        'donor_data': state['donor_data'],
+        'dictionary': pd.DataFrame({'key': dictionary.keys.to_numpy(), 'label': dictionary.labels}),
+        'dictionary_digest': dictionary.digest,
+        'file_hashes': dict(state['file_hashes']),
+        'file_partials': dict(state['file_partials']),
+        'keys': dict(index.keys),
+        'skipped': dict(index.skipped),
+        'dataset_version': state['dataset_version'],
+        'derived': artifacts.registered(state['dataset_version']),
+        'precomputed_report': bool(state.get('precomputed_report')),
+        'memory_saved': state.get('memory_saved', 0),
+    }
+
+
+def _save(folder, state):
+    version = state['dataset_version']
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+        if not (folder / version / 'manifest.json').exists():
+            tmp_dir = Path(tempfile.mkdtemp(dir=folder, prefix='.tmp-'))
+            try:
+                _write_session(tmp_dir, state)
+                os.replace(tmp_dir, folder / version)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        _point_latest(folder, version)
+        _remove_others(folder, version)
+        _remove_expired()
+    except Exception:
+        # Columns pyarrow can't serialize, or a full disk, just skip the snapshot
+        return
+
+
+def _write_session(out, state):
+    files = []
+    for i, (name, file_hash) in enumerate(state['file_hashes'].items()):
+        partials = state['file_partials'][name]
+        (out / str(i)).mkdir()
+        for key in _PARTIAL_FRAMES:
+            if partials[key] is not None:
+                _write(out / str(i) / f"{key}.arrow", partials[key])
+        _write(out / str(i) / 'keys.arrow', pd.DataFrame({'key': state['keys'][name]}))
+        files.append({
+            'name': name,
+            'hash': file_hash,
+            'skipped': state['skipped'][name],
+            'total_donations': partials['total_donations'],
+            'org_rows': partials['org_rows'],
+        })
+
+    derived = state['derived']
+    (out / 'derived').mkdir()
+    for name, frame in derived.items():
+        _write(out / 'derived' / f"{name}.arrow", frame)
+    _write(out / 'dictionary.arrow', state['dictionary'])
+    if not store.ENABLED:
+        _write(out / 'donor_data.arrow', state['donor_data'])
+
+    manifest = {
+        'format': FORMAT,
+        'storage': 'duckdb' if store.ENABLED else 'memory',
+        'dataset_version': state['dataset_version'],
+        'dictionary_digest': state['dictionary_digest'],
+        'files': files,
+        'derived': sorted(derived),
+        'precomputed_report': state['precomputed_report'],
+        'memory_saved': state['memory_saved'],
+    }
+    (out / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+
+
+def restore():
+    """Load the token's latest snapshot into a session that has no data yet; True if one was restored."""
+    if not ENABLED:
+        return False
+    token = _token()
+    if token is None or 'donor_data' in st.session_state:
+        return False
+    # A refresh right after an upload waits for that upload's snapshot
+    _wait(token)
+    folder = _latest(SNAPSHOT_DIR / token)
+    if folder is None:
+        return False
+    try:
+        manifest = json.loads((folder / 'manifest.json').read_text())
+        if manifest['format'] != FORMAT or manifest['storage'] != ('duckdb' if store.ENABLED else 'memory'):
+            return False
+        file_hashes = [entry['hash'] for entry in manifest['files']]
+        # The store drops files no session has used for a while
+        if store.ENABLED and not store.has_files(file_hashes):
+            return False
+        state = _read_session(folder, manifest)
+        derived = {name: _read(folder / 'derived' / f"{name}.arrow") for name in manifest['derived']}
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return False
+    st.session_state.update(state)
+    if derived:
+        artifacts.register(manifest['dataset_version'], derived)
+    if store.ENABLED:
+        store.use(file_hashes)
+    try:
+        # Keeps the token from expiring while it is in use
+        os.utime(SNAPSHOT_DIR / token / 'latest')
+    except OSError:
+        pass
+    return True
+
+
+def _read_session(folder, manifest):
+    terms = _read(folder / 'dictionary.arrow')
+    dictionary = DonorDictionary()
+    dictionary.keys = pd.Index(terms['key'].to_numpy(dtype=object), dtype=object)
+    dictionary.labels = terms['label'].to_numpy(dtype=object)
+    dictionary.digest = manifest['dictionary_digest']
+
+    file_hashes, file_partials, keys, skipped = {}, {}, {}, {}
+    for i, entry in enumerate(manifest['files']):
+        name = entry['name']
+        file_hashes[name] = entry['hash']
+        partials = {key: entry[key] for key in ['total_donations', 'org_rows']}
+        for key in _PARTIAL_FRAMES:
+            path = folder / str(i) / f"{key}.arrow"
+            partials[key] = _read(path) if path.exists() else None
+        file_partials[name] = partials
+        keys[name] = _read(folder / str(i) / 'keys.arrow')['key'].to_numpy()
+        skipped[name] = entry['skipped']
+    index = TransactionIndex.from_keys(keys, skipped)
+
+    if store.ENABLED:
+        donor_data = store.Selection(file_hashes.values(), dictionary, dedupe=bool(index.dependents()))
+    else:
+        donor_data = _read(folder / 'donor_data.arrow')
+    return {
+        'donor_data': donor_data,
+        'uploaded_file_names': list(file_hashes),
+        # Nothing is in this session's uploader yet, so no loaded file counts as removed
+        'last_uploaded_files': [],
+        'donor_dictionary': dictionary,
+        'file_hashes': file_hashes,
+        'file_partials': file_partials,
+        'transaction_index': index,
+        'dataset_version': manifest['dataset_version'],
+        'precomputed_report': manifest['precomputed_report'],
+        'memory_saved': manifest['memory_saved'],
+        'restored_snapshot': True,
+        'snapshot_version': manifest['dataset_version'],
+    }
+
+
+def clear():
+    """Drop the session's data and its token's latest snapshot, so a refresh starts empty."""
+    for key in SESSION_KEYS + _DERIVED_KEYS:
+        st.session_state.pop(key, None)
+    token = _token()
+    if token is None:
+        return
+    _wait(token)
+    latest = _latest(SNAPSHOT_DIR / token)
+    if latest is not None:
+        try:
+            (SNAPSHOT_DIR / token / 'latest').unlink()
+        except OSError:
+            pass
+        shutil.rmtree(latest, ignore_errors=True)
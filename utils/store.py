@@ -0,0 +1,361 @@
+"""Optional DuckDB store shared by every session on the host.
+
+Set CVC_STORAGE=duckdb to enable it. Each parsed export is written once, keyed
+by its content hash, into a single database file (CVC_DUCKDB_PATH). A session
+then keeps only a Selection, which lists the file hashes it has loaded, in
+st.session_state['donor_data'] in place of a DataFrame. The page aggregations
+run as SQL over those files, so sessions hold only small result frames.
+
+use() records which files each live session has loaded. A file that no live
+session references and that hasn't been used for CVC_DUCKDB_RETENTION_HOURS
+is dropped from the store, so the database doesn't grow with every export
+ever uploaded.
+"""
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.dedupe import transaction_keys
+from utils.donor_ids import donor_keys
+from utils.schema import PERIOD_COLUMNS, compact_frame
+from utils.summary import finish_donor_summary
+
+ENABLED = os.environ.get('CVC_STORAGE', 'memory').strip().lower() == 'duckdb'
+DB_PATH = os.environ.get('CVC_DUCKDB_PATH') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'donors.duckdb'
+)
+
+# Unreferenced files are kept this long, so a restored snapshot or a reconnecting session still finds them
+RETENTION_HOURS = float(os.environ.get('CVC_DUCKDB_RETENTION_HOURS', '24'))
+
+# Transaction columns kept in the store, besides the file hash, row number and donor key/label
+STORE_COLUMNS = {
+    'Date': 'TIMESTAMP',
+    'Donation Amount': 'DOUBLE',
+    'Email': 'VARCHAR',
+    'Campaign Title': 'VARCHAR',
+    'ZIP': 'VARCHAR',
+    'Donor Type': 'VARCHAR',
+}
+
+# Ingest-time derived columns (schema.add_derived_columns), computed by the store on read
+DERIVED_SQL = {
+    'Donation Month': 'coalesce(year("Date") * 12 + month("Date") - 1, -1)',
+    'Donation Quarter': 'coalesce(year("Date") * 4 + (month("Date") - 1) // 3, -1)',
+    'Donation Year': 'coalesce(year("Date"), -1)',
+    'Campaign Clean': r"""regexp_replace("Campaign Title", '\s*\d{4}$', '')""",
+}
+
+_COLUMN_LIST = ', '.join(f'"{col}"' for col in STORE_COLUMNS)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    file_hash VARCHAR PRIMARY KEY,
+    row_count BIGINT,
+    loaded_at TIMESTAMP DEFAULT current_timestamp
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    file_hash VARCHAR,
+    row_no BIGINT,
+    donor_key VARCHAR,
+    donor_label VARCHAR,
+    {', '.join(f'"{col}" {sql_type}' for col, sql_type in STORE_COLUMNS.items())}
+);
+-- dedupe.transaction_keys(); NULL for files stored before it was kept
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS txn_key UBIGINT;
+ALTER TABLE files ADD COLUMN IF NOT EXISTS last_used TIMESTAMP;
+"""
+
+# Rows of the selected files that pass the session's filter, with each file's position in load order
+_SELECTED = """
+WITH selected AS (
+    SELECT t.*, s.file_pos
+    FROM transactions t
+    JOIN (SELECT unnest($hashes) AS file_hash, generate_subscripts($hashes, 1) AS file_pos) s USING (file_hash)
+    WHERE {where}
+    {dedupe}
+)
+"""
+
+# A transaction already in an earlier selected file is a duplicate (see utils/dedupe.py)
+_DEDUPE = "QUALIFY txn_key IS NULL OR file_pos = min(file_pos) OVER (PARTITION BY txn_key)"
+
+
+@st.cache_resource(show_spinner=False)
+def _connection():
+    import duckdb
+
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    con = duckdb.connect(DB_PATH)
+    con.execute(_SCHEMA)
+    return con
+
+
+@contextmanager
+def _cursor():
+    # DuckDB connections are not thread-safe; each query gets its own cursor
+    cur = _connection().cursor()
+    try:
+        yield cur
+    finally:
+        cur.close()
+
+
+@st.cache_resource(show_spinner=False)
+def _sessions():
+    """File hashes each session on this server has loaded, by session ID."""
+    return {}
+
+
+def _live(session_id):
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
+
+
+def use(file_hashes):
+    """Record the files the current session has loaded, and drop files no session has used lately."""
+    file_hashes = list(file_hashes)
+    sessions = _sessions()
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        sessions[ctx.session_id] = frozenset(file_hashes)
+    for session_id in [s for s in list(sessions) if not _live(s)]:
+        sessions.pop(session_id, None)
+    referenced = set(file_hashes).union(*sessions.values())
+
+    with _cursor() as cur:
+        cur.execute("UPDATE files SET last_used = current_timestamp WHERE list_contains($hashes, file_hash)",
+                    {'hashes': file_hashes})
+        stale = [row[0] for row in cur.execute(
+            "SELECT file_hash FROM files "
+            "WHERE coalesce(last_used, loaded_at) < current_timestamp - to_seconds($seconds)",
+            {'seconds': RETENTION_HOURS * 3600}
+        ).fetchall() if row[0] not in referenced]
+        if stale:
+            cur.execute("DELETE FROM transactions WHERE list_contains($hashes, file_hash)", {'hashes': stale})
+            cur.execute("DELETE FROM files WHERE list_contains($hashes, file_hash)", {'hashes': stale})
+            # Lets later inserts reuse the freed blocks
+            cur.execute("CHECKPOINT")
+
+
+def has_files(file_hashes):
+    """Whether every one of ``file_hashes`` is still in the store."""
+    file_hashes = list(file_hashes)
+    with _cursor() as cur:
+        row = cur.execute("SELECT count(*) FROM files WHERE list_contains($hashes, file_hash)",
+                          {'hashes': file_hashes}).fetchone()
+    return int(row[0]) == len(set(file_hashes))
+
+
+def add_file(file_hash, df):
+    """Write one parsed export to the store unless a session already has."""
+    with _cursor() as cur:
+        if not cur.execute("SELECT 1 FROM files WHERE file_hash = ?", [file_hash]).fetchone():
+            _insert(cur, file_hash, df)
+
+
+def _insert(cur, file_hash, df):
+    keys, labels = donor_keys(df)
+    incoming = pd.DataFrame({
+        'file_hash': file_hash,
+        'row_no': np.arange(len(df), dtype=np.int64),
+        'donor_key': pd.Series(keys, dtype=object),
+        'donor_label': pd.Series(labels, dtype=object),
+    })
+    for col in STORE_COLUMNS:
+        values = df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        incoming[col] = values.to_numpy()
+    incoming['txn_key'] = transaction_keys(df)
+
+    cur.register('incoming', incoming)
+    try:
+        cur.execute("BEGIN TRANSACTION")
+        cur.execute("INSERT INTO files (file_hash, row_count, last_used) VALUES (?, ?, current_timestamp)",
+                    [file_hash, len(df)])
+        columns = f"file_hash, row_no, donor_key, donor_label, {_COLUMN_LIST}, txn_key"
+        cur.execute(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM incoming")
+        cur.execute("COMMIT")
+    except Exception:
+        # Another session stored the same file first
+        cur.execute("ROLLBACK")
+        if not cur.execute("SELECT 1 FROM files WHERE file_hash = ?", [file_hash]).fetchone():
+            raise
+    finally:
+        cur.unregister('incoming')
+
+
+class Selection:
+    """The files one session has loaded, queried in place in the shared store.
+
+    Stands in for the session DataFrame: it has ``empty``, ``columns`` and
+    ``len()``, and ``frame()`` materializes only the columns a row-level
+    computation needs. ``filtered()`` narrows it to a filters.DataFilter.
+    With ``dedupe`` set, transactions already in an earlier file are skipped.
+    """
+
+    columns = pd.Index([*STORE_COLUMNS, *DERIVED_SQL, 'Donor ID'])
+
+    def __init__(self, file_hashes, dictionary, data_filter=None, dedupe=False):
+        self.file_hashes = list(file_hashes)
+        self.dictionary = dictionary
+        self.data_filter = data_filter
+        self.dedupe = dedupe
+
+    def filtered(self, data_filter):
+        """The same files, restricted to the rows passing ``data_filter``."""
+        return Selection(self.file_hashes, self.dictionary, data_filter, self.dedupe)
+
+    def _where(self):
+        """SQL condition and parameters for the filter."""
+        data_filter = self.data_filter
+        if data_filter is None or not data_filter.active:
+            return 'true', {}
+        conditions, params = [], {}
+        if data_filter.start is not None:
+            conditions.append('"Date" >= $start')
+            params['start'] = pd.Timestamp(data_filter.start).to_pydatetime()
+        if data_filter.end is not None:
+            conditions.append('"Date" < $end')
+            params['end'] = data_filter.end_bound().to_pydatetime()
+        if data_filter.campaigns:
+            conditions.append('list_contains($campaigns, "Campaign Title")')
+            params['campaigns'] = list(data_filter.campaigns)
+        if data_filter.donor_types:
+            conditions.append('list_contains($donor_types, "Donor Type")')
+            params['donor_types'] = list(data_filter.donor_types)
+        return ' AND '.join(conditions), params
+
+    @property
+    def empty(self):
+        # Every row of the first file is kept by the dedupe, so only a filter can select none of the stored rows
+        if self.data_filter is not None and self.data_filter.active:
+            return len(self) == 0
+        return self._stored_rows() == 0
+
+    def __len__(self):
+        if self.dedupe or (self.data_filter is not None and self.data_filter.active):
+            return int(self._query("SELECT count(*) AS n FROM selected").iloc[0]['n']) if self.file_hashes else 0
+        return self._stored_rows()
+
+    def _stored_rows(self):
+        if not self.file_hashes:
+            return 0
+        with _cursor() as cur:
+            row = cur.execute(
+                "SELECT coalesce(sum(row_count), 0) FROM files WHERE list_contains($hashes, file_hash)",
+                {'hashes': self.file_hashes}
+            ).fetchone()
+        return int(row[0])
+
+    def _query(self, sql):
+        where, params = self._where()
+        selected = _SELECTED.format(where=where, dedupe=_DEDUPE if self.dedupe else '')
+        with _cursor() as cur:
+            return cur.execute(selected + sql, {'hashes': self.file_hashes, **params}).df()
+
+    def _donor_ids(self, keys):
+        return self.dictionary.keys.get_indexer(pd.Index(keys, dtype=object)).astype(np.int32)
+
+    def frame(self, columns):
+        """Row-level frame with just ``columns``, in load order."""
+        select = [f'"{col}"' for col in columns if col in STORE_COLUMNS]
+        select += [f'{DERIVED_SQL[col]} AS "{col}"' for col in columns if col in DERIVED_SQL]
+        if 'Donor ID' in columns:
+            select.append('donor_key')
+        if not select:
+            select = ['row_no']
+        frame = self._query(f"SELECT {', '.join(select)} FROM selected ORDER BY file_pos, row_no")
+        if 'Donor ID' in columns:
+            frame['Donor ID'] = self._donor_ids(frame.pop('donor_key'))
+        for col, dtype in PERIOD_COLUMNS.items():
+            if col in frame.columns:
+                frame[col] = frame[col].astype(dtype)
+        return compact_frame(frame[[col for col in columns if col in frame.columns]])
+
+    def filter_options(self):
+        """``(first date, last date, campaigns, donor types)`` for the filter sidebar, ignoring the filter."""
+        unfiltered = Selection(self.file_hashes, self.dictionary, dedupe=self.dedupe)
+        dates = unfiltered._query('SELECT min("Date") AS first, max("Date") AS last FROM selected').iloc[0]
+        values = unfiltered._query("""
+            SELECT 'campaign' AS kind, "Campaign Title" AS value FROM selected WHERE "Campaign Title" IS NOT NULL
+            UNION
+            SELECT 'type', "Donor Type" FROM selected WHERE "Donor Type" IS NOT NULL
+            ORDER BY 1, 2
+        """)
+        first, last = (None, None) if pd.isna(dates['first']) else (dates['first'].date(), dates['last'].date())
+        return (first, last, values.loc[values['kind'] == 'campaign', 'value'].tolist(),
+                values.loc[values['kind'] == 'type', 'value'].tolist())
+
+    def monthly_totals(self):
+        monthly = self._query("""
+            SELECT date_trunc('month', "Date") AS "Month", coalesce(sum("Donation Amount"), 0) AS "Donation Amount"
+            FROM selected WHERE "Date" IS NOT NULL GROUP BY 1 ORDER BY 1
+        """)
+        monthly['Cumulative Total'] = monthly['Donation Amount'].cumsum()
+        return monthly
+
+    def overview_stats(self):
+        row = self._query("""
+            SELECT
+                coalesce(sum("Donation Amount"), 0) AS total_donations,
+                count(DISTINCT donor_key) AS unique_donors,
+                count(*) FILTER (WHERE "Donor Type" = 'Organization') AS org_donors
+            FROM selected
+        """).iloc[0]
+        repeat = self._query("""
+            SELECT count(*) AS repeat_donors FROM (
+                SELECT donor_key FROM selected WHERE donor_key IS NOT NULL GROUP BY 1 HAVING count(*) > 1
+            )
+        """).iloc[0]
+        return {
+            'total_donations': float(row['total_donations']),
+            'unique_donors': int(row['unique_donors']),
+            'repeat_donors': int(repeat['repeat_donors']),
+            'org_donors': int(row['org_donors']),
+        }
+
+    def campaign_summary(self, dated_only=False):
+        where = 'AND "Date" IS NOT NULL' if dated_only else ''
+        return self._query(f"""
+            SELECT "Campaign Title",
+                coalesce(sum("Donation Amount"), 0) AS "Total Raised",
+                count("Donation Amount") AS "Donation Count",
+                avg("Donation Amount") AS "Average Gift"
+            FROM selected WHERE "Campaign Title" IS NOT NULL {where}
+            GROUP BY 1 ORDER BY 1
+        """)
+
+    def zip_summary(self):
+        totals = self._query("""
+            SELECT "ZIP", coalesce(sum("Donation Amount"), 0) AS "Donation Amount"
+            FROM selected WHERE "ZIP" IS NOT NULL GROUP BY 1 ORDER BY 2 DESC
+        """)
+        return totals.set_index('ZIP')['Donation Amount']
+
+    def donor_type_counts(self):
+        return self._query("""
+            SELECT "Donor Type", count(*) AS "count"
+            FROM selected WHERE "Donation Amount" IS NOT NULL AND "Donor Type" IS NOT NULL
+            GROUP BY 1 ORDER BY 2 DESC
+        """)
+
+    def donor_summary(self):
+        """Per-donor stats in the layout of summary.build_donor_summary."""
+        stats = self._query("""
+            SELECT donor_key,
+                min("Date") AS "First Gift",
+                max("Date") AS "Last Gift",
+                count("Date") AS "Gift Count",
+                coalesce(sum("Donation Amount"), 0) AS "Total Amount",
+                arg_min("Donor Type", file_pos * 4294967296 + row_no) AS "Donor Type",
+                count(*) AS "Rows"
+            FROM selected WHERE donor_key IS NOT NULL GROUP BY 1
+        """)
+        stats.index = pd.Index(self._donor_ids(stats.pop('donor_key')), name='Donor ID')
+        return finish_donor_summary(stats.sort_index(), self.dictionary)
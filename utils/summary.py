@@ -0,0 +1,82 @@
+"""Per-donor summary shared by every page."""
+import numpy as np
+import pandas as pd
+
+from utils.donor_ids import UNKNOWN_DONOR
+
+
+def donor_partials(df):
+    """Per-donor aggregates of ``df`` that merge_donor_partials() can combine across files."""
+    known = df[df['Donor ID'] != UNKNOWN_DONOR]
+    return known.groupby('Donor ID').agg(**{
+        'First Gift': ('Date', 'min'),
+        'Last Gift': ('Date', 'max'),
+        'Gift Count': ('Date', 'count'),
+        'Total Amount': ('Donation Amount', 'sum'),
+        'Donor Type': ('Donor Type', 'first'),
+        'Rows': ('Date', 'size'),
+    })
+
+
+def merge_donor_partials(partials):
+    """Combine donor_partials() of one or more files, given in load order.
+
+    Donor IDs are dense, so every statistic is a scatter into arrays indexed
+    by ID rather than a groupby over the concatenated partials.
+    """
+    nonempty = [p for p in partials if len(p)]
+    if not nonempty:
+        return partials[0]
+    partials = nonempty
+
+    def stacked(col, dtype=None):
+        return np.concatenate([p[col].to_numpy(dtype=dtype) for p in partials])
+
+    ids = np.concatenate([p.index.to_numpy(np.int64) for p in partials])
+    size = int(ids.max()) + 1
+    present = np.flatnonzero(np.bincount(ids, minlength=size))
+
+    # Dates as int64 ticks; NaT is the smallest int64, so it must be kept out of the min
+    unit = np.datetime_data(partials[0]['First Gift'].dtype)[0]
+    nat, latest = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+    first_gifts = stacked('First Gift', f'datetime64[{unit}]').view(np.int64)
+    first = np.full(size, latest)
+    np.minimum.at(first, ids, np.where(first_gifts == nat, latest, first_gifts))
+    first[first == latest] = nat
+    last = np.full(size, nat)
+    np.maximum.at(last, ids, stacked('Last Gift', f'datetime64[{unit}]').view(np.int64))
+
+    # The earliest file with a known type wins, so write the files latest first
+    types = np.full(size, None, dtype=object)
+    offsets = np.cumsum([0] + [len(p) for p in partials])
+    for i in reversed(range(len(partials))):
+        file_types = partials[i]['Donor Type']
+        known = file_types.notna().to_numpy()
+        types[ids[offsets[i]:offsets[i + 1]][known]] = file_types.to_numpy(dtype=object)[known]
+    categories = pd.Index(np.concatenate([p['Donor Type'].cat.categories.to_numpy(dtype=object) for p in partials]))
+
+    def total(col):
+        return np.bincount(ids, weights=stacked(col), minlength=size)[present]
+
+    return pd.DataFrame({
+        'First Gift': first[present].view(f'datetime64[{unit}]'),
+        'Last Gift': last[present].view(f'datetime64[{unit}]'),
+        'Gift Count': total('Gift Count').astype(np.int64),
+        'Total Amount': total('Total Amount'),
+        'Donor Type': pd.Categorical(types[present], categories=categories.unique()),
+        'Rows': total('Rows').astype(np.int64),
+    }, index=pd.Index(present, dtype=partials[0].index.dtype, name='Donor ID'))
+
+
+def finish_donor_summary(stats, dictionary):
+    """Donor summary from (merged) donor partials: adds cohort, retention status and label."""
+    summary = stats.drop(columns='Rows')
+    summary['Cohort Quarter'] = summary['First Gift'].dt.to_period('Q').dt.start_time
+    summary['Retention Status'] = np.where(summary['Gift Count'] > 1, 'Returning', 'New')
+    summary.insert(0, 'Donor', dictionary.label(summary.index))
+    return summary
+
+
+def build_donor_summary(df, dictionary):
+    """One row per known donor, indexed by Donor ID."""
+    return finish_donor_summary(donor_partials(df), dictionary)
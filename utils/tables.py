@@ -0,0 +1,69 @@
+"""Paged detail tables: only the visible page is sorted out and sent to the browser."""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [10, 25, 50, 100]
+
+
+def _search(frame, columns, query):
+    if not query or not columns:
+        return frame
+    mask = np.zeros(len(frame), dtype=bool)
+    for col in columns:
+        values = frame[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Match against the distinct categories, then select rows by code
+            hits = values.cat.categories.astype(str).str.contains(query, case=False, regex=False)
+            mask |= np.isin(values.cat.codes.to_numpy(), np.flatnonzero(hits))
+        else:
+            mask |= values.astype(str).str.contains(query, case=False, regex=False).to_numpy()
+    return frame[mask]
+
+
+def _page(frame, column, descending, start, size):
+    stop = start + size
+    values = frame[column]
+    if stop <= len(frame) // 4 and (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+        # Early pages only need a partial selection, not a full sort
+        top = frame.nlargest(stop, column) if descending else frame.nsmallest(stop, column)
+        return top.iloc[start:stop]
+    return frame.sort_values(column, ascending=not descending, kind='stable').iloc[start:stop]
+
+
+def paged_table(frame, key, sort_by=None, descending=True, search_columns=None):
+    """Render one page of ``frame`` with server-side search and sort."""
+    columns = list(frame.columns)
+    search_columns = [c for c in (search_columns or []) if c in columns]
+
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    query = col1.text_input("Search", key=f"{key}_search") if search_columns else ''
+    sort_col = col2.selectbox(
+        "Sort by", columns, index=columns.index(sort_by) if sort_by in columns else 0, key=f"{key}_sort"
+    )
+    descending = col3.toggle("Descending", value=descending, key=f"{key}_desc")
+    page_size = col4.selectbox("Rows", PAGE_SIZES, key=f"{key}_size")
+
+    view = _search(frame, search_columns, query)
+    total = len(view)
+    pages = max(1, -(-total // page_size))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    st.dataframe(_page(view, sort_col, descending, start, page_size), hide_index=True, width='stretch')
+    st.caption(f"Rows {min(start + 1, total):,}–{min(start + page_size, total):,} of {total:,}")
+
+
+def detail_expander(label, key, frame, **table_kwargs):
+    """Expander whose paged table is only built while it is open.
+
+    ``frame`` may be a callable so that even preparing the table is skipped
+    while the expander is collapsed.
+    """
+    expander = st.expander(label, expanded=False, key=key, on_change='rerun')
+    if expander.open:
+        with expander:
+            paged_table(frame() if callable(frame) else frame, key=f"{key}_table", **table_kwargs)